@@ -1,14 +1,58 @@
-import random
 from collections import Counter
+import numpy as np
 import pandas as pd
 import time
 import os
 import sys
 import itertools
+import re
+import ast
+import types
+import inspect
+import glob
+import hashlib
 import json
+import gzip
+import uuid
+import math
+import signal
+import argparse
+import threading
+import multiprocessing
+import sqlite3
+import socket
+import hmac
+import secrets
+import asyncio
+import concurrent.futures
 
 # --- 기본 설정 ---
 SAVE_FILE = "yahtzee_save.json"
+JOURNAL_FILE = "yahtzee_save.journal"
+ANALYSIS_CHECKPOINT_FILE = "yahtzee_analysis_checkpoint.json"
+TUNER_CHECKPOINT_FILE = "yahtzee_tuner_checkpoint.json"
+POLICY_CACHE_FILE = "yahtzee_policy_cache.sqlite"
+LOG_STORE_DIR = "yahtzee_logs"
+
+# 게임 단위 설정. 대화형 게임은 엘리트형 CPU의 한 수 계산 시간을 제한하고,
+# 성능 분석처럼 시간을 들여도 되는 경우에는 None(제한 없음)으로 둔다.
+# policy_cache: 엘리트형 결정을 저장해 두고 다시 쓰는 디스크 캐시 경로 (None이면 사용 안 함).
+# 캐시를 쓰면 같은 seed라도 캐시 상태에 따라 결과가 달라지므로, 재현이 필요한 분석에서는 기본으로 끈다.
+DEFAULT_GAME_CONFIG = {
+    "elite_deadline_ms": 800,
+    "elite_category": "rule",
+    "advisor": False,
+    "policy_cache": POLICY_CACHE_FILE,
+}
+ANALYSIS_GAME_CONFIG = {
+    "elite_deadline_ms": None,
+    "elite_category": "rule",
+    "policy_cache": None,
+}
+# 엘리트형의 족보 선택 방식: "rule"(가중치/규칙) 또는 "value"(즉시 점수 + 상태 가치 표의 미래 기대 점수)
+ELITE_CATEGORY_MODES = ("rule", "value")
+VALUE_TABLE_FILE = "yahtzee_value_table.npy"
+MOMENT_TABLE_FILE = "yahtzee_moment_table.npy"
 
 CATEGORIES = [
     "Ones", "Twos", "Threes", "Fours", "Fives", "Sixes",
@@ -16,7 +60,11 @@ CATEGORIES = [
     "Small Straight", "Large Straight", "Yahtzee", "Chance"
 ]
 
-CPU_TYPES = ["엘리트형", "도박형", "공격형", "안정형", "일반형"]
+CPU_TYPES = ["엘리트형", "도박형", "공격형", "안정형", "일반형", "승부형"]
+
+# 주사위 5개의 조합(순서 무시) 252가지. 인덱스를 uint8 '주사위 코드'로 쓴다.
+DICE_COMBOS = list(itertools.combinations_with_replacement(range(1, 7), 5))
+DICE_COMBO_INDEX = {combo: i for i, combo in enumerate(DICE_COMBOS)}
 
 BASE_WEIGHTS = {
     "Ones": 0.3, "Twos": 0.4, "Threes": 0.6, "Fours": 0.8,
@@ -24,6 +72,76 @@ BASE_WEIGHTS = {
     "Small Straight": 1.1, "Large Straight": 1.6, "Yahtzee": 3.0, "Chance": 1.0
 }
 
+# 엘리트형/도박형의 손으로 정한 상수들. 자동 튜너(tune_profile)가 찾은 값으로 바꿔 끼울 수 있도록
+# config["profiles"]({CPU 유형: 프로필})로 전달하며, 프로필은 튜닝한 CPU 유형에만 적용한다. (없으면 이 기본값)
+# 도박형은 base_weights만 읽는다.
+DEFAULT_PROFILE = {
+    "base_weights": dict(BASE_WEIGHTS),
+    "upper_boost": 1.5,       # 상단 보너스가 아직일 때 남은 상단 족보 가중치 배수
+    "urgency_decay": 20.0,    # 긴급도 = 1 + (12 - 턴) / urgency_decay
+    "late_turn": 8,           # 이 턴부터 고득점 족보 가중치를 올린다
+    "late_boost": 1.5,
+    "sacrifice_order": ["Yahtzee", "Ones", "Twos", "Chance"],
+}
+PROFILE_FILE = "yahtzee_profile.json"
+TUNABLE_CPU_TYPES = ("엘리트형", "도박형")
+
+def config_profile(config, cpu_type):
+    """config["profiles"]에서 cpu_type용으로 튜닝된 프로필을 찾는다 (없으면 None = 기본값)"""
+    return ((config or {}).get("profiles") or {}).get(cpu_type)
+
+def content_fingerprint(obj):
+    """JSON으로 표현되는 값(설정, 프로필)의 내용 지문. 객체가 달라도 내용이 같으면 같은 값이다."""
+    return hashlib.sha1(json.dumps(obj, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()[:12]
+
+# --- 주사위 난수 소스 ---
+class DiceSource:
+    """PCG64 생성기로 주사위 눈을 블록 단위로 미리 뽑아 두고 꺼내 쓰는 난수 소스.
+    게임/워커마다 seed를 달리 주면 서로 독립적이고 재현 가능한 스트림이 된다."""
+
+    def __init__(self, seed=None, block_size=4096):
+        if isinstance(seed, np.random.SeedSequence):
+            self.seed_seq = seed
+        else:
+            self.seed_seq = np.random.SeedSequence(seed)
+        self._rng = np.random.Generator(np.random.PCG64(self.seed_seq))
+        self._block_size = block_size
+        self._buf = []
+        self._pos = 0
+        self.drawn = 0  # 지금까지 꺼낸 주사위 수 (저장된 게임을 같은 위치에서 이어 가는 데 쓴다)
+
+    def roll(self, n=5):
+        """주사위 n개를 굴린 결과(list)를 반환"""
+        self.drawn += n
+        end = self._pos + n
+        if end > len(self._buf):
+            fresh = self._rng.integers(1, 7, size=max(self._block_size, n), dtype=np.uint8).tolist()
+            self._buf = self._buf[self._pos:] + fresh
+            self._pos, end = 0, n
+        out = self._buf[self._pos:end]
+        self._pos = end
+        return out
+
+    def reroll(self, dice, reroll_indices):
+        """dice에서 reroll_indices 위치의 주사위만 다시 굴린다 (제자리 수정)"""
+        reroll_indices = list(reroll_indices)
+        for i, v in zip(reroll_indices, self.roll(len(reroll_indices))):
+            dice[i] = v
+        return dice
+
+    def skip(self, n):
+        """주사위 n개를 버린다. skip(drawn)이면 같은 seed의 새 소스가 drawn개를 꺼낸 뒤와 같은 위치가 된다."""
+        self.roll(n)
+
+    def spawn(self):
+        """현재 스트림과 독립적인 자식 난수 소스를 만든다 (AI 내부 시뮬레이션용)"""
+        return DiceSource(self.seed_seq.spawn(1)[0], self._block_size)
+
+_default_dice_source = DiceSource()
+
+def get_dice_source(dice_source=None):
+    return dice_source if dice_source is not None else _default_dice_source
+
 # --- 점수 계산 및 헬퍼 함수 ---
 def score_category(dice, category):
     """카테고리별 점수를 계산하는 함수"""
@@ -62,23 +180,24 @@ def calculate_bonus(upper_score):
 # --- AI 핵심 두뇌 ---
 
 # --- '엘리트형' AI를 위한 고급 전략 함수 ---
-def dynamic_weights_elite(turn, scoreboard):
-    w = BASE_WEIGHTS.copy()
+def dynamic_weights_elite(turn, scoreboard, profile=None):
+    p = profile or DEFAULT_PROFILE
+    w = dict(p["base_weights"])
     upper_score = calculate_upper_score(scoreboard)
     upper_categories_left = [c for c in CATEGORIES[:6] if scoreboard[c] is None]
 
     if upper_score < 63 and upper_categories_left:
-        urgency_factor = 1.0 + ((12 - turn) / 20.0) 
+        urgency_factor = 1.0 + ((12 - turn) / p["urgency_decay"])
         for cat in upper_categories_left:
-            w[cat] *= (1.5 * urgency_factor)
+            w[cat] *= (p["upper_boost"] * urgency_factor)
 
-    if turn >= 8 or upper_score >= 63:
+    if turn >= p["late_turn"] or upper_score >= 63:
         for cat in ("Yahtzee", "Full House", "Large Straight", "Four of a Kind"):
             if scoreboard.get(cat) is None:
-                w[cat] *= 1.5
+                w[cat] *= p["late_boost"]
     return w
 
-def cpu_select_category_elite(dice, scoreboard, turn):
+def cpu_select_category_elite(dice, scoreboard, turn, profile=None):
     possible = [c for c, s in scoreboard.items() if s is None]
     if not possible: return "Chance"
     scores = {cat: score_category(dice, cat) for cat in possible}
@@ -90,7 +209,7 @@ def cpu_select_category_elite(dice, scoreboard, turn):
     if "Small Straight" in scores and scores["Small Straight"] > 0 and turn <= 8:
         return "Small Straight"
 
-    w = dynamic_weights_elite(turn, scoreboard)
+    w = dynamic_weights_elite(turn, scoreboard, profile)
     weighted_scores = []
     for cat in possible:
         score = scores[cat]
@@ -106,51 +225,325 @@ def cpu_select_category_elite(dice, scoreboard, turn):
             if non_zero_scores:
                 return max(non_zero_scores, key=lambda x: x[1])[0]
         
-        sacrifice_priority = ["Yahtzee", "Ones", "Twos", "Chance"]
+        sacrifice_priority = (profile or DEFAULT_PROFILE)["sacrifice_order"]
         for sac_cat in sacrifice_priority:
             if scoreboard.get(sac_cat) is None and scores[sac_cat] == 0:
                 return sac_cat
     return best_choice
 
 # --- '도박형' 및 기타 AI를 위한 규칙/확률 기반 로직 ---
-def get_recommended_target_gambler(dice, scoreboard):
+def get_recommended_target_gambler(dice, scoreboard, profile=None):
+    weights = (profile or DEFAULT_PROFILE)["base_weights"]
     possible = [c for c, s in scoreboard.items() if s is None]
     if not possible: return "Chance"
-    return max(possible, key=lambda c: score_category(dice, c) * BASE_WEIGHTS.get(c, 1.0))
+    return max(possible, key=lambda c: score_category(dice, c) * weights.get(c, 1.0))
 
 def cpu_select_category_simple(dice, scoreboard):
     possible = [c for c, s in scoreboard.items() if s is None]
     if not possible: return "Chance"
     return max(possible, key=lambda cat: score_category(dice, cat))
 
+# --- 상태 가치 표 (미래 기대 점수) ---
+# 상태 = (사용한 족보 비트마스크 4096가지, 상단 합계 0~63(63 이상은 63으로 묶음)).
+# V[mask, up] = 그 상태에서 남은 턴을 최적으로 두었을 때 앞으로 얻을 기대 점수(보너스 포함).
+# 마스크가 큰 쪽부터 턴 하나의 기대값을 역방향으로 계산하며, 상단 합계 64칸은 numpy로 한 번에 처리한다.
+UPPER_CAP = 63
+KEEP_COMBOS = [k for r in range(6) for k in itertools.combinations_with_replacement(range(1, 7), r)]
+KEEP_COMBO_INDEX = {k: i for i, k in enumerate(KEEP_COMBOS)}
+_turn_tables_cache = None
+_value_table_cache = None
+_moment_table_cache = None
+
+def _turn_tables():
+    """턴 계산에 쓰는 고정 표들 (한 번만 만든다)
+    transition[k, d]: 고정 조합 k에서 나머지를 굴려 주사위 조합 d가 될 확률 (462×252)
+    sub_keeps[d, :]: 조합 d에서 고를 수 있는 고정 조합 인덱스 (중복은 첫 항목으로 채움, 252×32)
+    scores[d, c]: 조합 d를 족보 c에 기록했을 때의 점수 (252×12)"""
+    global _turn_tables_cache
+    if _turn_tables_cache is None:
+        transition = np.zeros((len(KEEP_COMBOS), len(DICE_COMBOS)))
+        for k, kept in enumerate(KEEP_COMBOS):
+            n = 5 - len(kept)
+            for outcome in itertools.product(range(1, 7), repeat=n):
+                transition[k, DICE_COMBO_INDEX[tuple(sorted(kept + outcome))]] += 1
+            transition[k] /= 6 ** n
+        sub_keeps = np.zeros((len(DICE_COMBOS), 32), dtype=np.intp)
+        for d, combo in enumerate(DICE_COMBOS):
+            subs = sorted({KEEP_COMBO_INDEX[tuple(combo[i] for i in range(5) if m >> i & 1)] for m in range(32)})
+            sub_keeps[d] = subs + [subs[0]] * (32 - len(subs))
+        scores = np.array([[score_category(list(combo), c) for c in CATEGORIES] for combo in DICE_COMBOS])
+        _turn_tables_cache = (transition, sub_keeps, scores)
+    return _turn_tables_cache
+
+def _category_values(V, mask, scores, ups=None):
+    """족보별로 '즉시 점수 + 기록 후 상태의 가치'를 (주사위 조합, 족보, 상단 합계) 배열로 반환.
+    이미 쓴 족보는 -inf. ups를 주면 그 상단 합계들만 계산한다."""
+    ups = np.arange(UPPER_CAP + 1) if ups is None else ups
+    out = np.full((scores.shape[0], len(CATEGORIES), len(ups)), -np.inf)
+    for c in range(len(CATEGORIES)):
+        if mask >> c & 1:
+            continue
+        s = scores[:, c:c + 1]
+        if c < 6:
+            new_up = np.minimum(ups + s, UPPER_CAP)
+            bonus = np.where((ups < UPPER_CAP) & (new_up >= UPPER_CAP), calculate_bonus(UPPER_CAP), 0)
+            out[:, c, :] = s + bonus + V[mask | 1 << c][new_up]
+        else:
+            out[:, c, :] = s + V[mask | 1 << c][ups][None, :]
+    return out
+
+def _turn_value_layers(V, mask):
+    """한 턴 안의 기대값을 굴림 단계별로 계산한다.
+    반환: [E3, E2, E1] 각 (252, 64) — k차 굴림 직후 주사위 조합별 기대값, 그리고 턴 시작 시점의 기대값 (64,)"""
+    transition, sub_keeps, scores = _turn_tables()
+    e3 = _category_values(V, mask, scores).max(axis=1)
+    e2 = (transition @ e3)[sub_keeps].max(axis=1)
+    e1 = (transition @ e2)[sub_keeps].max(axis=1)
+    return [e3, e2, e1], transition[KEEP_COMBO_INDEX[()]] @ e1
+
+def compute_value_table():
+    """모든 (mask, up) 상태의 가치 표를 계산한다 (4096×64, float64)"""
+    V = np.zeros((1 << len(CATEGORIES), UPPER_CAP + 1))
+    for mask in range((1 << len(CATEGORIES)) - 2, -1, -1):
+        V[mask] = _turn_value_layers(V, mask)[1]
+    return V
+
+def _load_cached_table(file_name, label, compute, path=None):
+    path = path or os.path.join(get_base_dir(), file_name)
+    try:
+        return np.load(path)
+    except (OSError, ValueError):
+        print(f"🧮 {label}를 계산합니다 (최초 1회)...")
+        table = compute()
+        tmp = f"{path}.{os.getpid()}.tmp.npy"
+        np.save(tmp, table)
+        os.replace(tmp, path)
+        return table
+
+def load_value_table(path=None):
+    """가치 표를 디스크 캐시에서 읽는다. 없으면 계산해서 저장한다 (프로세스당 한 번)"""
+    global _value_table_cache
+    if _value_table_cache is None:
+        _value_table_cache = _load_cached_table(VALUE_TABLE_FILE, "상태 가치 표", compute_value_table, path)
+    return _value_table_cache
+
+def _best_keeps(keep_values, sub_keeps):
+    """주사위 조합별로 기대값이 가장 큰 고정 조합 인덱스 (252, 상단 합계 수)"""
+    best = keep_values[sub_keeps].argmax(axis=1)
+    return np.take_along_axis(sub_keeps[:, :, None], best[:, None, :], axis=1)[:, 0, :]
+
+def _turn_second_moment(V, M2, mask):
+    """기대 점수 최대화 정책(가치 표의 선택)을 따를 때, 턴 시작 시점 미래 점수의 제곱 기대값 (64,)"""
+    transition, sub_keeps, scores = _turn_tables()
+    ups = np.arange(UPPER_CAP + 1)
+    values = _category_values(V, mask, scores)
+    choice = values.argmax(axis=1)                                   # (252, 64)
+    s = np.take_along_axis(scores, choice, axis=1)
+    upper = choice < 6
+    new_up = np.where(upper, np.minimum(ups + s, UPPER_CAP), ups)
+    reward = s + np.where(upper & (ups < UPPER_CAP) & (new_up >= UPPER_CAP), calculate_bonus(UPPER_CAP), 0)
+    e = values.max(axis=1)
+    m2 = reward ** 2 + 2 * reward * (e - reward) + M2[mask | 1 << choice, new_up]
+    for _ in range(2):
+        ek, m2k = transition @ e, transition @ m2
+        best = _best_keeps(ek, sub_keeps)
+        e, m2 = ek[best, ups], m2k[best, ups]
+    return transition[KEEP_COMBO_INDEX[()]] @ m2
+
+def compute_moment_table(V):
+    """모든 상태의 미래 점수 제곱 기대값 표 (분산 = M2 - V²)"""
+    M2 = np.zeros_like(V)
+    for mask in range((1 << len(CATEGORIES)) - 2, -1, -1):
+        M2[mask] = _turn_second_moment(V, M2, mask)
+    return M2
+
+def load_moment_table(path=None):
+    global _moment_table_cache
+    if _moment_table_cache is None:
+        V = load_value_table()
+        _moment_table_cache = _load_cached_table(MOMENT_TABLE_FILE, "미래 점수 분산 표",
+                                                 lambda: compute_moment_table(V), path)
+    return _moment_table_cache
+
+def scoreboard_state(scoreboard):
+    """점수판 → (사용한 족보 비트마스크, 상단 합계(63에서 묶음))"""
+    mask = sum(1 << i for i, c in enumerate(CATEGORIES) if scoreboard[c] is not None)
+    return mask, min(calculate_upper_score(scoreboard), UPPER_CAP)
+
+def category_values(dice, scoreboard, value_table=None):
+    """남은 족보별 '즉시 점수 + 기록 후 미래 기대 점수'를 dict로 반환 (족보당 표 조회 1회)"""
+    V = load_value_table() if value_table is None else value_table
+    mask, up = scoreboard_state(scoreboard)
+    values = {}
+    for c, cat in enumerate(CATEGORIES):
+        if scoreboard[cat] is not None:
+            continue
+        s = score_category(dice, cat)
+        if c < 6:
+            new_up = min(up + s, UPPER_CAP)
+            values[cat] = s + V[mask | 1 << c, new_up] + (calculate_bonus(new_up) if up < UPPER_CAP else 0)
+        else:
+            values[cat] = s + V[mask | 1 << c, up]
+    return values
+
+def cpu_select_category_value(dice, scoreboard, value_table=None):
+    values = category_values(dice, scoreboard, value_table)
+    if not values: return "Chance"
+    return max(values, key=values.get)
+
+# --- '승부형' AI: 상대 점수판을 보고 1등 확률을 최대화 ---
+# 각 플레이어의 최종 점수를 '현재 점수 + 미래 점수'로 보고, 미래 점수는 가치/분산 표의
+# 평균·분산을 갖는 정규분포로 근사한다. 이번 턴의 주사위와 선택은 정확히 계산한다.
+_HERMITE_NODES, _HERMITE_WEIGHTS = np.polynomial.hermite_e.hermegauss(24)
+_HERMITE_WEIGHTS = _HERMITE_WEIGHTS / math.sqrt(2 * math.pi)
+
+def _norm_cdf(z):
+    # Abramowitz-Stegun 7.1.26 erf 근사 (오차 1.5e-7), numpy 배열용
+    x = np.abs(z) / math.sqrt(2)
+    t = 1.0 / (1.0 + 0.3275911 * x)
+    poly = ((((1.061405429 * t - 1.453152027) * t + 1.421413741) * t - 0.284496736) * t + 0.254829592) * t
+    return 0.5 * (1.0 + np.sign(z) * (1.0 - poly * np.exp(-x * x)))
+
+def banked_score(scoreboard):
+    """지금까지 기록한 점수 + (이미 달성했다면) 상단 보너스"""
+    return sum(v for v in scoreboard.values() if v is not None) + calculate_bonus(calculate_upper_score(scoreboard))
+
+def final_score_moments(scoreboard):
+    """최종 점수의 (평균, 표준편차) — 남은 턴은 기대 점수 최대화 정책을 따른다고 가정"""
+    V, M2 = load_value_table(), load_moment_table()
+    mask, up = scoreboard_state(scoreboard)
+    return banked_score(scoreboard) + V[mask, up], math.sqrt(max(M2[mask, up] - V[mask, up] ** 2, 0.0))
+
+def win_probability(mean, std, opponents):
+    """내 최종 점수 ~ N(mean, std²)일 때 모든 상대(각각 (평균, 표준편차))보다 높을 확률. 동점은 절반"""
+    x = np.asarray(mean)[..., None] + np.asarray(std)[..., None] * _HERMITE_NODES
+    p = np.ones_like(x)
+    for opp_mean, opp_std in opponents:
+        p = p * _norm_cdf((x - opp_mean) / max(opp_std, 1e-6))
+    return (p * _HERMITE_WEIGHTS).sum(axis=-1)
+
+def _win_objective_table(scoreboard, opponents):
+    """(주사위 조합 252, 족보 12)별 목표값. 상대가 있으면 1등 확률, 없으면 최종 점수 기대값.
+    쓸 수 없는 족보는 -inf"""
+    V = load_value_table()
+    M2 = load_moment_table() if opponents else None
+    _, _, scores = _turn_tables()
+    mask, up = scoreboard_state(scoreboard)
+    banked = banked_score(scoreboard)
+    mean = np.full(scores.shape, -np.inf)
+    std = np.zeros(scores.shape)
+    for c in range(len(CATEGORIES)):
+        if mask >> c & 1:
+            continue
+        s = scores[:, c]
+        new_up = np.minimum(up + s, UPPER_CAP) if c < 6 else np.full_like(s, up)
+        bonus = calculate_bonus(UPPER_CAP) * ((up < UPPER_CAP) & (new_up >= UPPER_CAP))
+        next_mask = mask | 1 << c
+        mean[:, c] = banked + s + bonus + V[next_mask, new_up]
+        if opponents:
+            std[:, c] = np.sqrt(np.maximum(M2[next_mask, new_up] - V[next_mask, new_up] ** 2, 0.0))
+    if not opponents:
+        return mean
+    opp = [final_score_moments(board) for board in opponents]
+    return np.where(np.isfinite(mean), win_probability(np.where(np.isfinite(mean), mean, 0), std, opp), -np.inf)
+
+def _keep_objective_values(scoreboard, rolls_left, opponents):
+    """남은 굴림까지 정확히 펼쳐 본 고정 조합(462)별 목표값"""
+    transition, sub_keeps, _ = _turn_tables()
+    value = _win_objective_table(scoreboard, opponents).max(axis=1)
+    for _ in range(rolls_left - 1):
+        value = (transition @ value)[sub_keeps].max(axis=1)
+    return transition @ value
+
+def strategic_keep_win(dice, scoreboard, rolls_left, opponents):
+    """남은 굴림까지 정확히 펼쳐 보고 목표값이 가장 큰 고정안을 고른다 (같으면 더 많이 고정)"""
+    keep_values = _keep_objective_values(scoreboard, rolls_left, opponents)
+    best_mask = max(range(31, -1, -1), key=lambda m: keep_values[
+        KEEP_COMBO_INDEX[tuple(sorted(dice[i] for i in range(5) if m >> i & 1))]])
+    return [i for i in range(5) if best_mask >> i & 1]
+
+def cpu_select_category_win(dice, scoreboard, opponents):
+    possible = [c for c, s in scoreboard.items() if s is None]
+    if not possible: return "Chance"
+    row = _win_objective_table(scoreboard, opponents)[DICE_COMBO_INDEX[tuple(sorted(dice))]]
+    return CATEGORIES[int(row.argmax())]
+
+# --- 사람 플레이어용 수 추천 (어드바이저) ---
+# 승부형과 같은 정확한 한 턴 계산(목표: 최종 점수 기대값)을 쓰므로 프롬프트마다 수 ms면 충분하다.
+def keep_advice(dice, scoreboard, rolls_left):
+    """고정안별 기대 최종 점수를 [(keep_idxs, ev), ...] 내림차순으로 반환 (같은 눈 조합은 한 번만)"""
+    keep_values = _keep_objective_values(scoreboard, rolls_left, [])
+    options, seen = [], set()
+    for m in range(31, -1, -1):
+        kept = tuple(sorted(dice[i] for i in range(5) if m >> i & 1))
+        if kept not in seen:
+            seen.add(kept)
+            options.append(([i for i in range(5) if m >> i & 1], float(keep_values[KEEP_COMBO_INDEX[kept]])))
+    options.sort(key=lambda option: -option[1])
+    return options
+
+def category_advice(dice, scoreboard):
+    """족보별 기대 최종 점수를 [(category, ev), ...] 내림차순으로 반환"""
+    banked = banked_score(scoreboard)
+    values = category_values(dice, scoreboard)
+    return sorted(((cat, banked + float(v)) for cat, v in values.items()), key=lambda option: -option[1])
+
+def keep_ev_loss(dice, keep_idxs, options):
+    """사람이 고른 고정안이 최선안보다 기대 최종 점수에서 얼마나 손해인지"""
+    kept = sorted(dice[i] for i in keep_idxs)
+    chosen = next(ev for idxs, ev in options if sorted(dice[i] for i in idxs) == kept)
+    return round(options[0][1] - chosen, 3)
+
+def print_keep_advice(dice, options, top=3):
+    for rank, (keep_idxs, ev) in enumerate(options[:top], 1):
+        if len(keep_idxs) == 5:
+            action = "그대로 멈춤 (엔터)"
+        else:
+            reroll = "".join(str(i + 1) for i in range(5) if i not in keep_idxs)
+            action = f"재굴림 {reroll} (고정 {[dice[i] for i in keep_idxs]})"
+        print(f"  💡 추천 {rank}. {action} → 기대 최종 {ev:.1f}점")
+
+def print_category_advice(options, top=3):
+    for rank, (cat, ev) in enumerate(options[:top], 1):
+        print(f"  💡 추천 {rank}. {cat} → 기대 최종 {ev:.1f}점")
+
 # --- AI 유형별 dispatcher 함수 ---
-def cpu_select_category_dispatcher(dice, scoreboard, cpu_type, turn):
-    if cpu_type == "엘리트형":
-        return cpu_select_category_elite(dice, scoreboard, turn)
-    else:
-        return cpu_select_category_simple(dice, scoreboard)
+def cpu_select_category_dispatcher(dice, scoreboard, cpu_type, turn, config=None, opponents=None):
+    """opponents: 상대 점수판 목록 ('승부형'만 사용). cpu_type은 에이전트 레지스트리 이름이면 된다."""
+    return get_agent(cpu_type, config).choose_category(dice, scoreboard, turn, opponents)
 
 # --- 몬테카를로 시뮬레이션 함수 ---
-def estimate_expected_score(dice, keep_idxs, scoreboard, turn, rolls_left, n_sim=200):
+def simulate_keep_total(dice, keep_idxs, scoreboard, turn, rolls_left, n_sim, dice_source=None, value_table=None,
+                        profile=None):
+    """keep_idxs를 고정했을 때 n_sim회 시뮬레이션한 점수의 '합계'를 반환 (점진적 추정용)
+    value_table이 주어지면 족보를 가치 표로 고르고, 점수에도 미래 기대 점수를 더한다."""
+    ds = get_dice_source(dice_source)
     total = 0
+    reroll_indices = [i for i in range(5) if i not in keep_idxs]
     for _ in range(n_sim):
         sim_dice = dice.copy()
-        reroll_indices = [i for i in range(5) if i not in keep_idxs]
         for _ in range(rolls_left):
-            for i in reroll_indices:
-                sim_dice[i] = random.randint(1, 6)
-        best_cat = cpu_select_category_elite(sim_dice, scoreboard, turn)
+            ds.reroll(sim_dice, reroll_indices)
+        if value_table is not None:
+            total += max(category_values(sim_dice, scoreboard, value_table).values())
+            continue
+        best_cat = cpu_select_category_elite(sim_dice, scoreboard, turn, profile)
         total += score_category(sim_dice, best_cat)
-    return total / n_sim
+    return total
+
+def estimate_expected_score(dice, keep_idxs, scoreboard, turn, rolls_left, n_sim=200, dice_source=None, value_table=None,
+                            profile=None):
+    return simulate_keep_total(dice, keep_idxs, scoreboard, turn, rolls_left, n_sim, dice_source, value_table,
+                               profile) / n_sim
 
 # --- 각 CPU 유형별 주사위 유지 전략 함수 ---
-def get_candidate_keeps(dice, scoreboard, turn):
+def get_candidate_keeps(dice, scoreboard, turn, profile=None):
     counts = Counter(dice)
     candidates = [list(c) for r in range(6) for c in itertools.combinations(range(5), r)]
     if counts:
         top = counts.most_common(1)[0][0]
         candidates.append([i for i, d in enumerate(dice) if d == top])
-    w = dynamic_weights_elite(turn, scoreboard)
+    w = dynamic_weights_elite(turn, scoreboard, profile)
     possible = [c for c, s in scoreboard.items() if s is None]
     if possible:
         rec = max(possible, key=lambda c: score_category(dice, c) * w.get(c, 1.0))
@@ -164,22 +557,49 @@ def get_candidate_keeps(dice, scoreboard, turn):
             unique_cands.append(c)
     return unique_cands
 
-def strategic_keep_elite(dice, scoreboard, turn, rolls_left):
-    """[v2.3 수정] Two Pair일 경우, 풀하우스를 노리도록 '인간의 직감'을 강제 주입"""
+def evaluate_keeps_elite(dice, scoreboard, turn, rolls_left, deadline_ms=None, n_sim=500, batch_size=50, dice_source=None,
+                         value_table=None, profile=None):
+    """후보 고정안별 기대 점수를 [(keep_idxs, ev), ...]로 반환.
+    deadline_ms가 주어지면 후보별로 batch_size회씩 번갈아 시뮬레이션하며 추정치를 다듬고,
+    시간이 다 되면 그때까지의 추정치를 돌려준다. (첫 라운드는 항상 끝까지 수행)"""
+    unique_cands = get_candidate_keeps(dice, scoreboard, turn, profile)
+    deadline = None if deadline_ms is None else time.perf_counter() + deadline_ms / 1000.0
+    totals = [0] * len(unique_cands)
+    done = 0
+    while done < n_sim:
+        step = min(batch_size, n_sim - done)
+        for idx, keep_idxs in enumerate(unique_cands):
+            totals[idx] += simulate_keep_total(dice, keep_idxs, scoreboard, turn, rolls_left, step, dice_source, value_table,
+                                               profile)
+        done += step
+        if deadline is not None and time.perf_counter() >= deadline:
+            break
+    return [(keep_idxs, total / done) for keep_idxs, total in zip(unique_cands, totals)]
+
+def two_pair_keep_elite(dice, scoreboard):
+    """Two Pair이고 풀하우스가 비어 있으면 두 페어를 고정 (시뮬레이션 없이 정하는 수), 아니면 None"""
     counts = Counter(dice)
     if sorted(counts.values()) == [1, 2, 2] and scoreboard.get("Full House") is None:
         pair_nums = [num for num, count in counts.items() if count == 2]
         return [i for i, d in enumerate(dice) if d in pair_nums]
+    return None
+
+def strategic_keep_elite(dice, scoreboard, turn, rolls_left, deadline_ms=None, n_sim=500, batch_size=50, dice_source=None,
+                         value_table=None, profile=None):
+    """[v2.3 수정] Two Pair일 경우, 풀하우스를 노리도록 '인간의 직감'을 강제 주입
+    [v2.6] deadline_ms 안에서 점진적으로 다듬은 추정치(evaluate_keeps_elite) 중 최선 후보를 고른다."""
+    two_pair = two_pair_keep_elite(dice, scoreboard)
+    if two_pair is not None:
+        return two_pair
 
-    unique_cands = get_candidate_keeps(dice, scoreboard, turn)
     best_keep, best_ev = [], -1
-    for keep_idxs in unique_cands:
-        ev = estimate_expected_score(dice, keep_idxs, scoreboard, turn, rolls_left, n_sim=500)
+    for keep_idxs, ev in evaluate_keeps_elite(dice, scoreboard, turn, rolls_left, deadline_ms, n_sim, batch_size, dice_source,
+                                              value_table, profile):
         if ev > best_ev:
             best_ev, best_keep = ev, keep_idxs
     return best_keep
 
-def strategic_keep_gambler(dice, scoreboard):
+def strategic_keep_gambler(dice, scoreboard, profile=None):
     """[복원] 몬테카를로 시뮬레이션을 사용하지 않는, 규칙/확률 기반의 진짜 '도박사' AI"""
     counts = Counter(dice)
     if scoreboard.get("Yahtzee") is None and counts.most_common(1) and counts.most_common(1)[0][1] >= 4:
@@ -187,7 +607,7 @@ def strategic_keep_gambler(dice, scoreboard):
     if scoreboard.get("Full House") is None and sorted(counts.values())==[2,3]:
         return list(range(5))
     
-    tgt = get_recommended_target_gambler(dice, scoreboard)
+    tgt = get_recommended_target_gambler(dice, scoreboard, profile)
     if not tgt: return list(range(5))
     
     keep_indices = []
@@ -263,12 +683,484 @@ def strategic_keep_normal(dice, scoreboard, turn):
     if counts: return [i for i, d in enumerate(dice) if d == counts.most_common(1)[0][0]]
     return []
 
-def strategic_decide_dice_to_keep(dice, scoreboard, turn, cpu_type, rolls_left=2):
-    if cpu_type == "엘리트형": return strategic_keep_elite(dice, scoreboard, turn, rolls_left)
-    if cpu_type == "도박형": return strategic_keep_gambler(dice, scoreboard)
-    if cpu_type == "공격형": return strategic_keep_attack(dice, scoreboard, turn)
-    if cpu_type == "안정형": return strategic_keep_defense(dice, scoreboard, turn)
-    return strategic_keep_normal(dice, scoreboard, turn)
+def strategic_decide_dice_to_keep(dice, scoreboard, turn, cpu_type, rolls_left=2, config=None, dice_source=None,
+                                  opponents=None):
+    return get_agent(cpu_type, config).choose_keep(dice, scoreboard, turn, rolls_left, dice_source, opponents)
+
+# --- 규칙 기반 CPU 결정 표 ---
+# 규칙형 CPU(도박형/공격형/안정형/일반형)의 고정안은 항상 '눈이 집합 S에 속하는 주사위 전부'이고,
+# 주사위 배치에는 Counter의 동률 순서(처음 나온 순서)로만 의존한다. 남은 족보와 (안정형은) 상단 63 미만 여부까지
+# 같으면 결과가 같으므로, 그 입력을 키로 S(6비트 눈 마스크)를 메모해 두면 결정 한 번이 표 조회 한 번이 된다.
+RULE_KEEP_FUNCTIONS = {
+    "도박형": lambda dice, scoreboard, turn, profile: strategic_keep_gambler(dice, scoreboard, profile),
+    "공격형": lambda dice, scoreboard, turn, profile: strategic_keep_attack(dice, scoreboard, turn),
+    "안정형": lambda dice, scoreboard, turn, profile: strategic_keep_defense(dice, scoreboard, turn),
+    "일반형": lambda dice, scoreboard, turn, profile: strategic_keep_normal(dice, scoreboard, turn),
+}
+
+class RuleDecisionTable:
+    """규칙형 CPU 하나(와 프로필 하나)의 결정을 지연 메모하는 표"""
+
+    def __init__(self, cpu_type, profile=None):
+        self.cpu_type = cpu_type
+        self.profile = profile
+        self._keep_fn = RULE_KEEP_FUNCTIONS[cpu_type]
+        self._uses_upper = cpu_type == "안정형"
+        self._keeps = {}
+        self._categories = {}
+
+    def _state(self, scoreboard):
+        mask = 0
+        for i, cat in enumerate(CATEGORIES):
+            if scoreboard[cat] is not None:
+                mask |= 1 << i
+        below = self._uses_upper and calculate_upper_score(scoreboard) < 63
+        return mask, below
+
+    def keep(self, dice, scoreboard, turn=None):
+        mask, below = self._state(scoreboard)
+        key = (DICE_COMBO_INDEX[tuple(sorted(dice))], tuple(dict.fromkeys(dice)), mask, below)
+        faces = self._keeps.get(key)
+        if faces is None:
+            faces = 0
+            for i in self._keep_fn(dice, scoreboard, turn, self.profile):
+                faces |= 1 << dice[i]
+            self._keeps[key] = faces
+        return [i for i, d in enumerate(dice) if faces >> d & 1]
+
+    def category(self, dice, scoreboard):
+        key = (DICE_COMBO_INDEX[tuple(sorted(dice))], self._state(scoreboard)[0])
+        choice = self._categories.get(key)
+        if choice is None:
+            choice = self._categories[key] = cpu_select_category_simple(dice, scoreboard)
+        return choice
+
+    def __len__(self):
+        return len(self._keeps) + len(self._categories)
+
+_rule_tables = {}
+
+def rule_decision_table(cpu_type, profile=None):
+    # 프로필은 도박형의 base_weights에만 영향을 준다. 내용 지문으로 찾으므로 워커가 배치마다
+    # 새로 받은(unpickle한) 같은 내용의 프로필도 같은 표를 쓴다.
+    weights = profile["base_weights"] if profile is not None and cpu_type == "도박형" else None
+    key = (cpu_type, content_fingerprint(weights) if weights is not None else None)
+    table = _rule_tables.get(key)
+    if table is None:
+        table = _rule_tables[key] = RuleDecisionTable(cpu_type, profile if weights is not None else None)
+    return table
+
+def verify_rule_tables(states=300, seed=0):
+    """무작위 점수판 상태마다 7776가지 주사위 배치 전부에서 표의 결정과 원래 규칙 함수의 결정을 비교한다.
+    (불일치 수, 비교 수)를 반환"""
+    rng = np.random.default_rng(seed)
+    all_dice = [list(d) for d in itertools.product(range(1, 7), repeat=5)]
+    mismatches = compared = 0
+    for cpu_type, keep_fn in RULE_KEEP_FUNCTIONS.items():
+        table = RuleDecisionTable(cpu_type, DEFAULT_PROFILE)
+        for _ in range(states):
+            scoreboard = {c: None for c in CATEGORIES}
+            for i in rng.permutation(len(CATEGORIES))[:rng.integers(0, len(CATEGORIES))]:
+                cat = CATEGORIES[i]
+                scoreboard[cat] = int(rng.integers(0, 6)) * (i + 1) if i < 6 else int(rng.integers(0, 31))
+            turn = 12 - sum(v is None for v in scoreboard.values()) + 1
+            for dice in all_dice:
+                expected_keep = sorted(set(keep_fn(dice, scoreboard, turn, DEFAULT_PROFILE)))
+                if table.keep(dice, scoreboard, turn) != expected_keep \
+                        or table.category(dice, scoreboard) != cpu_select_category_simple(dice, scoreboard):
+                    mismatches += 1
+                compared += 1
+    return mismatches, compared
+
+# --- 에이전트 인터페이스와 레지스트리 ---
+# 모든 CPU 전략은 Agent로 감싸 레지스트리에 이름으로 등록한다. 시뮬레이터/대회/병렬 워커는
+# 이름으로 에이전트를 한 번 만들고, 이후 결정마다 유형 문자열을 비교하지 않고 메서드만 호출한다.
+class Agent:
+    """CPU 전략 공통 인터페이스.
+    choose_keep(dice, scoreboard, turn, rolls_left, dice_source, opponents) -> 고정할 주사위 인덱스 목록
+    choose_category(dice, scoreboard, turn, opponents) -> 기록할 족보
+    *_batch 변형은 위 인자 튜플의 목록을 받아 결정 목록을 돌려준다 (기본 구현은 하나씩 호출).
+    blocking이 True인 에이전트는 결정이 오래 걸릴 수 있어 게임 서버가 프로세스 풀에서 계산한다."""
+    name = None
+    blocking = False
+
+    def __init__(self, config=None):
+        self.config = config or ANALYSIS_GAME_CONFIG
+
+    def choose_keep(self, dice, scoreboard, turn, rolls_left=2, dice_source=None, opponents=None):
+        raise NotImplementedError
+
+    def choose_category(self, dice, scoreboard, turn, opponents=None):
+        raise NotImplementedError
+
+    def choose_keep_batch(self, states):
+        return [self.choose_keep(*state) for state in states]
+
+    def choose_category_batch(self, states):
+        return [self.choose_category(*state) for state in states]
+
+class RuleAgent(Agent):
+    """도박형/공격형/안정형/일반형: 메모된 규칙 결정 표를 조회한다"""
+
+    def __init__(self, cpu_type, config=None):
+        super().__init__(config)
+        self.name = cpu_type
+        self._profile = self._rule_table = None
+
+    def _table(self):
+        # 설정 dict는 바뀔 수 있으므로 프로필 객체가 달라졌을 때만 표를 다시 찾는다 (지문 계산은 그때 한 번)
+        profile = config_profile(self.config, self.name)
+        if self._rule_table is None or profile is not self._profile:
+            self._profile, self._rule_table = profile, rule_decision_table(self.name, profile)
+        return self._rule_table
+
+    def choose_keep(self, dice, scoreboard, turn, rolls_left=2, dice_source=None, opponents=None):
+        return self._table().keep(dice, scoreboard, turn)
+
+    def choose_category(self, dice, scoreboard, turn, opponents=None):
+        return self._table().category(dice, scoreboard)
+
+class EliteAgent(Agent):
+    """엘리트형: 몬테카를로 고정 + 규칙/가치 표 족보 선택, 디스크 결정 캐시 사용.
+    speculation에 SpeculativePlanner를 붙이면 미리 계산해 둔 1차 굴림 결정을 먼저 찾아 본다."""
+    name = "엘리트형"
+    blocking = True
+
+    def __init__(self, config=None):
+        super().__init__(config)
+        self.speculation = None
+
+    def compute_keep(self, dice, scoreboard, turn, rolls_left=2, dice_source=None):
+        """캐시를 거치지 않고 몬테카를로로 고정안을 계산한다"""
+        config = self.config
+        value_table = load_value_table() if config.get("elite_category") == "value" else None
+        return strategic_keep_elite(dice, scoreboard, turn, rolls_left,
+                                    deadline_ms=config.get("elite_deadline_ms"), n_sim=config.get("elite_n_sim", 500),
+                                    dice_source=dice_source, value_table=value_table,
+                                    profile=config_profile(config, self.name))
+
+    def choose_keep(self, dice, scoreboard, turn, rolls_left=2, dice_source=None, opponents=None):
+        config = self.config
+        cache = get_policy_cache(config.get("policy_cache"))
+        key = None
+        if cache is not None or self.speculation is not None:
+            key = policy_cache_key(dice, scoreboard, turn, rolls_left, config)
+        if cache is not None:
+            mask = cache.get(key)
+            if mask is not None:
+                return keep_idxs_from_sorted_mask(dice, mask)
+        mask = self.speculation.take(key) if self.speculation is not None else None
+        if mask is not None:
+            keep = keep_idxs_from_sorted_mask(dice, mask)
+        else:
+            keep = self.compute_keep(dice, scoreboard, turn, rolls_left, dice_source)
+        if cache is not None:
+            cache.put(key, keep_mask_sorted(dice, keep))
+        return keep
+
+    def choose_category(self, dice, scoreboard, turn, opponents=None):
+        if self.config.get("elite_category") == "value":
+            return cpu_select_category_value(dice, scoreboard)
+        return cpu_select_category_elite(dice, scoreboard, turn, config_profile(self.config, self.name))
+
+class WinAgent(Agent):
+    """승부형: 상대 점수판을 보고 승리 확률을 최대화한다"""
+    name = "승부형"
+
+    def choose_keep(self, dice, scoreboard, turn, rolls_left=2, dice_source=None, opponents=None):
+        return strategic_keep_win(dice, scoreboard, rolls_left, opponents or [])
+
+    def choose_category(self, dice, scoreboard, turn, opponents=None):
+        return cpu_select_category_win(dice, scoreboard, opponents or [])
+
+# --- 예전 버전 에이전트 (v0.1 ~ v2.5) ---
+# 버전 폴더의 스크립트는 그대로 두고, import 대신 AST에서 함수/클래스/import/대입문만 남겨 실행한다.
+# 메뉴 루프 같은 최상위 실행문은 버려지므로 게임이 시작되지 않는다. 예전 AI는 내부 시뮬레이션에
+# 전역 random 모듈을 쓰므로 DiceSource로는 재현되지 않는다 (게임 주사위는 그대로 재현된다).
+LEGACY_VERSIONS = {
+    "v0.1": "v0.1_rule",
+    "v1.0": "v1.0_mc_bug",
+    "v1.5": "v1.5_mc_fix",
+    "v2.0": "v2.0_strategy",
+    "v2.5": "v2.5_Yahtzee_final",
+}
+LEGACY_KEEP_STATEMENTS = (ast.Import, ast.ImportFrom, ast.FunctionDef, ast.ClassDef, ast.Assign, ast.AnnAssign)
+_legacy_modules = {}
+
+def _legacy_tree(version):
+    path = os.path.join(get_base_dir(), LEGACY_VERSIONS[version], "yahtzee_ai.py")
+    with open(path, 'r', encoding='utf-8') as f:
+        tree = ast.parse(f.read(), path)
+    tree.body = [node for node in tree.body if isinstance(node, LEGACY_KEEP_STATEMENTS)]
+    return path, tree
+
+def load_legacy_module(version):
+    """버전 폴더의 yahtzee_ai.py를 메뉴 실행 없이 모듈로 불러온다 (프로세스당 한 번)"""
+    module = _legacy_modules.get(version)
+    if module is None:
+        path, tree = _legacy_tree(version)
+        module = types.ModuleType(f"yahtzee_legacy_{version.replace('.', '_')}")
+        module.__file__ = path
+        exec(compile(tree, path, "exec"), module.__dict__)
+        _legacy_modules[version] = module
+    return module
+
+def _legacy_cpu_types(version):
+    # 모듈을 실행하지 않고 CPU_TYPES 리터럴만 읽는다. '랜덤'은 게임 시작 때 다른 유형으로 바뀌는 선택지라 제외
+    _, tree = _legacy_tree(version)
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(getattr(t, "id", None) == "CPU_TYPES" for t in node.targets):
+            return [t for t in ast.literal_eval(node.value) if t != "랜덤"]
+    return []
+
+class LegacyAgent(Agent):
+    """예전 버전의 결정 함수를 감싼다. 버전마다 인자 순서/이름이 달라서(turn/turn_num, rolls_left 유무)
+    시그니처의 매개변수 이름으로 인자를 맞춘다."""
+
+    def __init__(self, version, cpu_type, config=None):
+        super().__init__(config)
+        self.name = f"{version}/{cpu_type}"
+        self.cpu_type = cpu_type
+        self.blocking = cpu_type in ("엘리트형", "도박형") and version != "v0.1"
+        module = load_legacy_module(version)
+        self._keep_fn = module.strategic_decide_dice_to_keep
+        self._category_fn = getattr(module, "cpu_select_category_dispatcher", None) or module.cpu_select_category
+        self._keep_params = set(inspect.signature(self._keep_fn).parameters)
+        self._category_params = set(inspect.signature(self._category_fn).parameters)
+
+    @staticmethod
+    def _kwargs(params, dice, scoreboard, cpu_type, turn, rolls_left=None):
+        kwargs = {"dice": dice, "scoreboard": scoreboard, "cpu_type": cpu_type}
+        kwargs["turn_num" if "turn_num" in params else "turn"] = turn
+        if "rolls_left" in params:
+            kwargs["rolls_left"] = rolls_left
+        return kwargs
+
+    def choose_keep(self, dice, scoreboard, turn, rolls_left=2, dice_source=None, opponents=None):
+        return self._keep_fn(**self._kwargs(self._keep_params, dice, scoreboard, self.cpu_type, turn, rolls_left))
+
+    def choose_category(self, dice, scoreboard, turn, opponents=None):
+        return self._category_fn(**self._kwargs(self._category_params, dice, scoreboard, self.cpu_type, turn))
+
+AGENT_REGISTRY = {}
+_legacy_registered = False
+_agents = {}
+
+def register_agent(name, factory):
+    """factory(config) -> Agent. 같은 이름으로 다시 등록하면 덮어쓴다."""
+    AGENT_REGISTRY[name] = factory
+
+def _register_legacy_agents():
+    # 버전 폴더 파일을 읽어야 하므로 예전 에이전트 이름이 처음 필요할 때 등록한다
+    global _legacy_registered
+    if _legacy_registered:
+        return
+    _legacy_registered = True
+    for version, folder in LEGACY_VERSIONS.items():
+        if not os.path.exists(os.path.join(get_base_dir(), folder, "yahtzee_ai.py")):
+            continue
+        for cpu_type in _legacy_cpu_types(version):
+            register_agent(f"{version}/{cpu_type}",
+                           lambda config, version=version, cpu_type=cpu_type: LegacyAgent(version, cpu_type, config))
+
+def agent_names():
+    _register_legacy_agents()
+    return list(AGENT_REGISTRY)
+
+def create_agent(name, config=None):
+    """이름으로 새 에이전트를 만든다. 현재 CPU 유형은 한글 이름, 예전 버전은 'v2.5/엘리트형' 형식"""
+    if name not in AGENT_REGISTRY and "/" in name:
+        _register_legacy_agents()
+    if name not in AGENT_REGISTRY:
+        raise ValueError(f"알 수 없는 에이전트: {name}")
+    return AGENT_REGISTRY[name](config)
+
+def get_agent(name, config=None):
+    """(이름, 설정 내용)마다 하나씩 만들어 두고 다시 쓴다. 풀 워커가 배치마다 새로 받은 같은 내용의 설정도
+    같은 에이전트를 쓴다. 게임을 구별할 뿐 결정에는 쓰이지 않는 키(game_id, seed)는 지문에서 뺀다."""
+    settings = {k: v for k, v in (config or {}).items() if k not in ("game_id", "seed")}
+    key = (name, content_fingerprint(settings))
+    agent = _agents.get(key)
+    if agent is None:
+        agent = _agents[key] = create_agent(name, config)
+    return agent
+
+register_agent("엘리트형", EliteAgent)
+register_agent("승부형", WinAgent)
+for _cpu_type in RULE_KEEP_FUNCTIONS:
+    register_agent(_cpu_type, lambda config, cpu_type=_cpu_type: RuleAgent(cpu_type, config))
+
+# --- 엘리트형 결정 캐시 (디스크 영속) ---
+# 키 = (설정 지문, 정렬된 주사위, 남은 족보 마스크, 상단 보너스 달성 여부, 턴, 남은 굴림).
+# 값 = 정렬된 주사위 기준 고정 마스크. 여러 프로세스가 같은 sqlite 파일(WAL)을 함께 채우고 읽는다.
+class PolicyCache:
+    def __init__(self, path, flush_every=256):
+        self.path = path
+        self.flush_every = flush_every
+        self._conn = sqlite3.connect(path, timeout=60)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS decisions (key TEXT PRIMARY KEY, keep INTEGER NOT NULL)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self._conn.commit()
+        self._memo = {}
+        self._pending = {}
+        self.hits = self.misses = 0
+        self._flushed_hits = self._flushed_misses = 0
+
+    def get(self, key):
+        mask = self._memo.get(key)
+        if mask is None:
+            row = self._conn.execute("SELECT keep FROM decisions WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                mask = self._memo[key] = row[0]
+        if mask is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return mask
+
+    def put(self, key, mask):
+        self._memo[key] = self._pending[key] = mask
+        if len(self._pending) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        """새 결정과 적중/실패 횟수를 한 트랜잭션으로 반영한다 (먼저 쓴 결정이 남는다)"""
+        with self._conn:
+            self._conn.executemany("INSERT OR IGNORE INTO decisions (key, keep) VALUES (?, ?)", self._pending.items())
+            for name, delta in (("hits", self.hits - self._flushed_hits), ("misses", self.misses - self._flushed_misses)):
+                self._conn.execute("INSERT INTO counters (name, value) VALUES (?, ?) "
+                                   "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value", (name, delta))
+        self._pending.clear()
+        self._flushed_hits, self._flushed_misses = self.hits, self.misses
+
+    def totals(self):
+        """파일 전체(모든 프로세스 합산)의 (적중, 실패, 저장된 결정 수)"""
+        counters = dict(self._conn.execute("SELECT name, value FROM counters"))
+        entries = self._conn.execute("SELECT COUNT(*) FROM decisions").fetchone()[0]
+        return counters.get("hits", 0), counters.get("misses", 0), entries
+
+_policy_caches = {}
+
+def get_policy_cache(path):
+    """프로세스마다 하나씩 연다 (fork된 워커가 부모의 sqlite 연결을 물려 쓰지 않도록 pid로 구분)"""
+    if not path:
+        return None
+    path = path if os.path.isabs(path) else os.path.join(get_base_dir(), path)
+    cache = _policy_caches.get(path)
+    if cache is None or cache[0] != os.getpid():
+        cache = _policy_caches[path] = (os.getpid(), PolicyCache(path))
+    return cache[1]
+
+def flush_policy_caches():
+    for pid, cache in _policy_caches.values():
+        if pid == os.getpid():
+            cache.flush()
+
+def policy_cache_key(dice, scoreboard, turn, rolls_left, config):
+    # 결정에 영향을 주는 설정은 지문으로 묶어 키에 넣는다. 가치 표 모드는 상단 합계 자체가 결정에 쓰인다.
+    fingerprint = content_fingerprint({**{k: config.get(k) for k in ("elite_deadline_ms", "elite_category", "elite_n_sim")},
+                                       "profile": config_profile(config, "엘리트형")})
+    mask, up = scoreboard_state(scoreboard)
+    upper = up if config.get("elite_category") == "value" else int(up >= UPPER_CAP)
+    return f"{fingerprint}|{dice_code(dice)}|{mask}|{upper}|{turn}|{rolls_left}"
+
+def keep_idxs_from_sorted_mask(dice, mask):
+    """정렬된 주사위 기준 고정 마스크를 현재 주사위 배치의 위치 목록으로 바꾼다"""
+    order = sorted(range(5), key=lambda i: dice[i])
+    return sorted(order[j] for j in range(5) if mask >> j & 1)
+
+# --- 추측 계산 (사람이 생각하는 동안 엘리트형의 다음 턴 준비) ---
+# CPU의 점수판은 사람 차례 동안 바뀌지 않으므로, 다음 턴 1차 굴림(252가지 조합)의 고정 결정을
+# 나올 확률이 높은 조합부터 백그라운드 스레드에서 미리 계산해 둔다. input() 대기 중에는 GIL이 풀려 있어
+# 사람 입력을 방해하지 않고, CPU 차례가 오면 멈춘다. 2차 굴림 결정은 고정안과 새 주사위에 달려 있어 추측하지 않는다.
+# 후보 고정안의 몬테카를로 추정치는 '남긴 눈의 조합'에만 달려 있으므로(나머지는 다시 굴림), 점수판마다
+# 최대 462가지 조합을 한 번씩만 추정해 모든 1차 굴림 결정에 나눠 쓴다. 그래서 몇 초면 252가지 전부가 채워진다.
+FIRST_ROLL_ORDER = sorted(DICE_COMBOS, key=lambda combo: -math.factorial(5) // math.prod(
+    math.factorial(n) for n in Counter(combo).values()))
+
+class SpeculativePlanner:
+    """엘리트형 에이전트의 1차 굴림 결정을 미리 계산해 policy_cache_key별로 보관한다"""
+
+    def __init__(self, agent):
+        self.agent = agent
+        self._results = {}
+        self._stop = threading.Event()
+        self._thread = None
+        self.hits = self.misses = 0
+
+    def start(self, targets):
+        """targets: [(점수판, 턴)] — 이어지는 CPU 턴들. 이전 추측은 버리고 새로 시작한다."""
+        self.stop()
+        self._results = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=([(dict(sb), t) for sb, t in targets],
+                                                                self._results, self._stop), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        # 진행 중인 결정 하나는 끝까지 계산되지만 기다리지 않는다 (결과는 키가 달라 섞이지 않음)
+        self._stop.set()
+
+    def _run(self, targets, results, stop):
+        config = self.agent.config
+        value_table = load_value_table() if config.get("elite_category") == "value" else None
+        profile, n_sim = config_profile(config, self.agent.name), config.get("elite_n_sim", 500)
+        ds = DiceSource()
+        estimates = [{} for _ in targets]  # 대상별 {남긴 눈 조합: 기대 점수}
+        for combo in FIRST_ROLL_ORDER:
+            dice = list(combo)
+            for (scoreboard, turn), evs in zip(targets, estimates):
+                keep = two_pair_keep_elite(dice, scoreboard)
+                if keep is None:
+                    best_ev = -1
+                    for cand in get_candidate_keeps(dice, scoreboard, turn, profile):
+                        kept = tuple(sorted(dice[i] for i in cand))
+                        if kept not in evs:
+                            if stop.is_set():
+                                return
+                            evs[kept] = estimate_expected_score(dice, cand, scoreboard, turn, 2, n_sim, ds,
+                                                                value_table, profile)
+                        if evs[kept] > best_ev:
+                            best_ev, keep = evs[kept], cand
+                results[policy_cache_key(dice, scoreboard, turn, 2, config)] = keep_mask_sorted(dice, keep)
+
+    def take(self, key):
+        if not key.endswith("|2"):
+            return None  # 1차 굴림(남은 굴림 2회) 결정만 추측한다
+        mask = self._results.get(key)
+        if mask is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return mask
+
+def measure_speculation(turns=6, think_seconds=5.0, seed=0):
+    """사람이 think_seconds 동안 고민하는 상황을 흉내 내며, 추측 계산이 있을 때와 없을 때의
+    엘리트형 CPU 턴 체감 시간(굴림 2번 + 족보 선택)을 같은 주사위 seed로 비교한다"""
+    config = dict(DEFAULT_GAME_CONFIG, policy_cache=None)
+    summary = {}
+    for speculate in (False, True):
+        agent = EliteAgent(config)
+        planner = agent.speculation = SpeculativePlanner(agent) if speculate else None
+        ds = DiceSource([seed, 0])
+        ai_ds = ds.spawn()
+        scoreboard = {c: None for c in CATEGORIES}
+        turn_ms = []
+        for turn in range(1, turns + 1):
+            if planner is not None:
+                planner.start([(scoreboard, turn)])
+            time.sleep(think_seconds)  # 사람이 입력을 고민하는 시간
+            if planner is not None:
+                planner.stop()
+            start = time.perf_counter()
+            play_agent_turn(agent, ds, scoreboard, turn, ai_ds)
+            turn_ms.append((time.perf_counter() - start) * 1000)
+        label = "추측 계산" if speculate else "기본"
+        summary[label] = np.mean(turn_ms)
+        hit_text = f", 1차 결정 적중 {planner.hits}/{planner.hits + planner.misses}" if planner else ""
+        print(f"[{label}] CPU 턴 평균 {np.mean(turn_ms):.0f}ms, 최대 {np.max(turn_ms):.0f}ms{hit_text}")
+    return summary
 
 # --- UI 및 게임 흐름 함수 ---
 def display_scoreboard(player_name, scoreboard):
@@ -289,49 +1181,93 @@ def display_dice_with_indices(dice):
     for i, d in enumerate(dice, 1):
         print(f"  {i}: 🎲 {d}")
 
-def play_turn(player, turn_num, player_logs):
+def play_turn(player, turn_num, records=None, config=None, dice_source=None, journal_event=None, resume=None,
+              opponents=None, ai_dice_source=None):
+    """ai_dice_source가 주어지면 CPU 내부 시뮬레이션은 게임 주사위(dice_source)와 다른 이 스트림을 쓴다.
+    journal_event가 주어지면 굴림 결과와 족보 기록을 이벤트로 남기고,
+    resume({"roll", "dice", "drawn"})가 주어지면 턴 도중 저장된 지점의 주사위로 이어서 진행하며,
+    dice_source를 저장 당시까지 꺼낸 주사위 수(drawn)만큼 건너뛰어 이미 본 굴림이 다시 나오지 않게 한다.
+    opponents는 상대 점수판 목록으로, 상대를 보고 두는 CPU('승부형')에 전달된다.
+    사람 플레이어의 결정에는 최선안 대비 기대 점수 손실(ev_loss)을 함께 기록하고,
+    config의 "advisor"가 켜져 있으면 프롬프트마다 추천 수를 보여 준다."""
+    ds = get_dice_source(dice_source)
     scoreboard = player['scoreboard']
     player_name, is_cpu, cpu_type = player['name'], player['is_cpu'], player['type']
+    advisor = bool((config or {}).get("advisor")) and not is_cpu
     print(f"\n<<<<< {player_name}의 {turn_num}턴 >>>>>")
-    dice = [random.randint(1, 6) for _ in range(5)]
-    log = []
+    if resume is not None:
+        dice, first_roll = list(resume["dice"]), resume["roll"]
+        if "drawn" in resume:
+            ds.skip(resume["drawn"])
+        else:
+            ds = ds.spawn()  # 꺼낸 수가 없는 예전 저장: 처음부터 다시 꺼내면 이미 본 눈이 되풀이되므로 다른 스트림을 쓴다
+        print(f"⏯️ 저장된 {first_roll}차 굴림부터 이어서 진행합니다.")
+    else:
+        dice, first_roll = ds.roll(5), 1
+    ai_ds = ai_dice_source if ai_dice_source is not None else ds
     roll_number = 0
 
-    for r in range(1, 4):
+    def journal_roll(roll):
+        if journal_event is not None:
+            journal_event({"type": "roll", "turn": turn_num, "roll": roll, "dice": list(dice), "drawn": ds.drawn})
+
+    def record(kind, roll, prompt_started, keep_idxs=None, **extra):
+        # 사람 플레이어의 결정만 상태-행동 레코드로 남긴다
+        if records is not None and not is_cpu:
+            think_ms = round((time.perf_counter() - prompt_started) * 1000)
+            records.write_decision(kind, player_name, turn_num, roll, dice, scoreboard, keep_idxs,
+                                   think_ms=think_ms, **extra)
+
+    def advise_keeps(rolls_done):
+        # 추천을 보여 주지 않더라도 기록할 ev_loss 계산에 쓴다
+        if records is None and not advisor:
+            return None
+        options = keep_advice(dice, scoreboard, 3 - rolls_done)
+        if advisor:
+            print_keep_advice(dice, options)
+        return options
+
+    def record_keep(roll, prompt_started, keep_idxs, options):
+        keep_idxs = list(keep_idxs)
+        extra = {"ev_loss": keep_ev_loss(dice, keep_idxs, options)} if options else {}
+        record("keep", roll, prompt_started, keep_idxs, **extra)
+
+    for r in range(first_roll, 4):
         roll_number = r
+        journal_roll(r)
         if not is_cpu:
             display_scoreboard(player_name, scoreboard)
         display_dice_with_indices(dice)
-        if not is_cpu:
-            log.append(f"🎲 {r}차 굴림: {dice}")
         if r == 3:
             break
         
         rolls_left = 3 - r
         if is_cpu:
-            keep_indices = strategic_decide_dice_to_keep(dice, scoreboard, turn_num, cpu_type, rolls_left)
+            keep_indices = strategic_decide_dice_to_keep(dice, scoreboard, turn_num, cpu_type, rolls_left, config, ai_ds,
+                                                         opponents)
             if len(keep_indices) == 5:
                 print("CPU: 모든 주사위 고정.")
                 break
             print(f"CPU ({cpu_type}) 고정: {[dice[i] for i in keep_indices]}")
             time.sleep(1)
             new_dice = [d for i, d in enumerate(dice) if i in keep_indices]
-            new_dice.extend([random.randint(1, 6) for _ in range(5 - len(new_dice))])
+            new_dice.extend(ds.roll(5 - len(new_dice)))
             dice = new_dice
         else: # 사람 플레이어
+            options = advise_keeps(r)
+            prompt_started = time.perf_counter()
             raw = input("재굴림할 주사위 번호 (예:13, 엔터 시 중단): ").strip()
             if not raw:
-                log.append(f"{r}차 굴림 종료 (엔터 입력)")
+                record_keep(r, prompt_started, range(5), options)
                 break
             
             reroll_indices = {int(c) - 1 for c in raw if c.isdigit() and 1 <= int(c) <= 5}
-            log.append(f"{r}차 굴림 - 재굴림: {sorted([i+1 for i in reroll_indices])}")
-            for idx in reroll_indices:
-                dice[idx] = random.randint(1, 6)
+            record_keep(r, prompt_started, [i for i in range(5) if i not in reroll_indices], options)
+            ds.reroll(dice, sorted(reroll_indices))
 
     if is_cpu:
         display_scoreboard(player_name, scoreboard)
-        choice = cpu_select_category_dispatcher(dice, scoreboard, cpu_type, turn_num)
+        choice = cpu_select_category_dispatcher(dice, scoreboard, cpu_type, turn_num, config, opponents)
     else: # 사람 플레이어
         while True:
             display_scoreboard(player_name, scoreboard)
@@ -342,6 +1278,10 @@ def play_turn(player, turn_num, player_logs):
             
             if roll_number < 3:
                 print("0. 다시 주사위 굴리기")
+            category_options = category_advice(dice, scoreboard) if advisor or records is not None else None
+            if advisor:
+                print_category_advice(category_options)
+            prompt_started = time.perf_counter()
             sel = input(f"번호 선택 (0-{len(possible)}): ").strip()
 
             if sel == '0' and roll_number < 3:
@@ -350,26 +1290,31 @@ def play_turn(player, turn_num, player_logs):
                     roll_number = r_cont
                     print(f"\n--- {r_cont}차 굴림 ---")
                     display_dice_with_indices(dice)
+                    options = advise_keeps(r_cont - 1)  # 화면의 주사위는 직전 굴림 결과
+                    prompt_started = time.perf_counter()
                     raw = input("재굴림할 주사위 번호 (예:13, 엔터 시 중단): ").strip()
                     if not raw:
-                        log.append(f"{r_cont}차 굴림 전 중단")
+                        record_keep(r_cont - 1, prompt_started, range(5), options)
                         break
                     reroll_indices = {int(c) - 1 for c in raw if c.isdigit() and 1 <= int(c) <= 5}
-                    log.append(f"{r_cont}차 굴림 - 재굴림: {sorted([i+1 for i in reroll_indices])}")
-                    for idx in reroll_indices:
-                        dice[idx] = random.randint(1, 6)
+                    record_keep(r_cont - 1, prompt_started, [i for i in range(5) if i not in reroll_indices], options)
+                    ds.reroll(dice, sorted(reroll_indices))
+                    journal_roll(r_cont)
                 continue
             elif sel.isdigit() and 1 <= int(sel) <= len(possible):
                 choice = list(possible.keys())[int(sel) - 1]
+                extra = {}
+                if category_options:
+                    extra["ev_loss"] = round(category_options[0][1] - dict(category_options)[choice], 3)
+                record("score", roll_number, prompt_started, choice=choice, score=possible[choice], **extra)
                 break
             else:
                 print("잘못된 입력입니다. 다시 선택해주세요.")
 
     score = score_category(dice, choice)
     scoreboard[choice] = score
-    log.append(f"최종 선택: {choice} ({score}점)")
-    if not is_cpu:
-        player_logs.setdefault(player_name, []).extend([f"[{turn_num}턴]"] + log)
+    if journal_event is not None:
+        journal_event({"type": "score", "turn": turn_num, "choice": choice, "score": score})
     print(f"-> {player_name}님이 '{choice}'에 {score}점을 기록했습니다.")
     time.sleep(1)
 
@@ -387,39 +1332,418 @@ def print_final_scores(players):
     if len(final_scores) > 1:
         print(f"\n🏆 최종 우승자: {final_scores[0]['name']} ({final_scores[0]['score']}점)")
 
-def run_single_game_simulation(cpu_type):
+# --- 시뮬레이션 트레이스 기록 ---
+def dice_code(dice):
+    """주사위 5개를 0~251 범위의 조합 코드로 변환"""
+    return DICE_COMBO_INDEX[tuple(sorted(dice))]
+
+def keep_mask_sorted(dice, keep_idxs):
+    """고정한 주사위를 '정렬된 주사위' 기준 5비트 마스크로 변환 (같은 눈은 앞쪽부터 채움)"""
+    kept = Counter(dice[i] for i in keep_idxs)
+    mask = 0
+    for pos, d in enumerate(sorted(dice)):
+        if kept[d] > 0:
+            kept[d] -= 1
+            mask |= 1 << pos
+    return mask
+
+class TraceRecorder:
+    """게임별 턴 기록(주사위 코드, 고정 마스크, 족보, 점수)을 열 단위 배열로 모아
+    청크마다 .npy 파일로 내보낸다. 한 게임은 항상 12행이며 행 순서가 곧 (게임, 턴)이다.
+    - dice     : uint8 (턴, 3)  굴림별 주사위 코드, 굴리지 않은 굴림은 255
+    - keep     : uint8 (턴, 2)  재굴림 전 고정 마스크(정렬 기준), 쓰이지 않으면 255
+    - category : uint8 (턴,)    CATEGORIES 인덱스
+    - score    : int16 (턴,)    해당 턴에 기록한 점수
+    - total    : int16 (게임,)  보너스 포함 최종 점수"""
+    NO_ROLL = 255
+
+    def __init__(self, out_dir, chunk_games=65536, chunks=0, games=0):
+        """chunks/games를 주면 이미 기록된 청크 뒤에 이어서 쓴다 (체크포인트 재개용)"""
+        os.makedirs(out_dir, exist_ok=True)
+        self.out_dir = out_dir
+        self.chunk_games = chunk_games
+        self.games = games
+        self.chunks = chunks
+        self._alloc()
+
+    def _alloc(self):
+        rows = self.chunk_games * 12
+        self._dice = np.full((rows, 3), self.NO_ROLL, dtype=np.uint8)
+        self._keep = np.full((rows, 2), self.NO_ROLL, dtype=np.uint8)
+        self._category = np.zeros(rows, dtype=np.uint8)
+        self._score = np.zeros(rows, dtype=np.int16)
+        self._total = np.zeros(self.chunk_games, dtype=np.int16)
+        self._row = 0
+        self._game = 0
+
+    def record_turn(self, dice_codes, keep_masks, category, score):
+        row = self._row
+        self._dice[row, :len(dice_codes)] = dice_codes
+        self._keep[row, :len(keep_masks)] = keep_masks
+        self._category[row] = CATEGORIES.index(category)
+        self._score[row] = score
+        self._row += 1
+
+    def end_game(self, total_score):
+        self._total[self._game] = total_score
+        self._game += 1
+        self.games += 1
+        if self._game == self.chunk_games:
+            self.flush()
+
+    def flush(self):
+        if self._game == 0:
+            return
+        rows = self._game * 12
+        columns = {"dice": self._dice[:rows], "keep": self._keep[:rows], "category": self._category[:rows],
+                   "score": self._score[:rows], "total": self._total[:self._game]}
+        for name, arr in columns.items():
+            np.save(os.path.join(self.out_dir, f"{name}-{self.chunks:05d}.npy"), arr)
+        self.chunks += 1
+        with open(os.path.join(self.out_dir, "meta.json"), 'w', encoding='utf-8') as f:
+            json.dump({"games": self.games, "chunks": self.chunks, "categories": CATEGORIES}, f, ensure_ascii=False)
+        self._alloc()
+
+    def mark(self):
+        return (self.chunks, self._game, self.games)
+
+    def rollback(self, mark):
+        """mark() 이후 기록된 게임을 버린다. 그 사이 청크가 이미 파일로 나갔다면 False"""
+        chunks, game, games = mark
+        if chunks != self.chunks:
+            return False
+        self._dice[game * 12:] = self.NO_ROLL
+        self._keep[game * 12:] = self.NO_ROLL
+        self._row, self._game, self.games = game * 12, game, games
+        return True
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def iter_trace_chunks(trace_dir):
+    """TraceRecorder가 남긴 청크를 메모리 맵 배열(dict)로 하나씩 돌려준다"""
+    with open(os.path.join(trace_dir, "meta.json"), 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    for chunk in range(meta["chunks"]):
+        yield {name: np.load(os.path.join(trace_dir, f"{name}-{chunk:05d}.npy"), mmap_mode='r')
+               for name in ("dice", "keep", "category", "score", "total")}
+
+def run_single_game_simulation(cpu_type, config=None, dice_source=None, trace=None, actions=None):
+    """게임 한 판을 시뮬레이션한다. 게임용 주사위와 AI 내부 시뮬레이션용 주사위는
+    서로 다른 스트림을 쓰므로, 같은 seed의 게임은 AI 종류와 무관하게 같은 주사위 흐름을 받는다.
+    actions(list)가 주어지면 턴마다 (정렬 기준 고정 마스크 목록, 족보)를 덧붙인다 (리플레이용).
+    cpu_type 대신 Agent 객체를 직접 넘겨도 된다."""
+    ds = dice_source if dice_source is not None else DiceSource()
+    ai_ds = ds.spawn()
+    agent = cpu_type if isinstance(cpu_type, Agent) else get_agent(cpu_type, config)
     scoreboard = {c: None for c in CATEGORIES}
     for turn in range(1, 13):
-        dice = [random.randint(1, 6) for _ in range(5)]
+        dice = ds.roll(5)
+        dice_codes, keep_masks = [dice_code(dice)], []
         for r in range(2):
             rolls_left = 2 - r
-            keep = strategic_decide_dice_to_keep(dice, scoreboard, turn, cpu_type, rolls_left)
+            keep = agent.choose_keep(dice, scoreboard, turn, rolls_left, ai_ds)
+            if trace is not None or actions is not None:
+                keep_masks.append(keep_mask_sorted(dice, keep))
             if len(keep) == 5: break
             
             new_dice = [d for i, d in enumerate(dice) if i in keep]
             reroll_count = 5 - len(new_dice)
-            new_dice.extend([random.randint(1, 6) for _ in range(reroll_count)])
+            new_dice.extend(ds.roll(reroll_count))
             dice = new_dice
+            if trace is not None:
+                dice_codes.append(dice_code(dice))
         
-        choice = cpu_select_category_dispatcher(dice, scoreboard, cpu_type, turn)
-        if scoreboard.get(choice) is None:
-            scoreboard[choice] = score_category(dice, choice)
-        else:
+        choice = agent.choose_category(dice, scoreboard, turn)
+        if scoreboard.get(choice) is not None:
             possible = [c for c, s in scoreboard.items() if s is None]
-            if possible:
-                scoreboard[possible[0]] = score_category(dice, possible[0])
+            choice = possible[0]
+        scoreboard[choice] = score_category(dice, choice)
+        if trace is not None:
+            trace.record_turn(dice_codes, keep_masks, choice, scoreboard[choice])
+        if actions is not None:
+            actions.append((keep_masks, choice))
 
     upper_score = calculate_upper_score(scoreboard)
     bonus = calculate_bonus(upper_score)
     total_score = sum(v for v in scoreboard.values() if v is not None) + bonus
+    if trace is not None:
+        trace.end_game(total_score)
     return total_score
 
-def analyze_cpu_performance(cpu_type, num_simulations=100):
-    print(f"\n===== CPU 유형: [{cpu_type}] 성능 분석 =====")
-    print(f"시뮬레이션 횟수: {num_simulations}회")
-    print("분석 중...")
-    scores = [run_single_game_simulation(cpu_type) for _ in range(num_simulations)]
-    scores_series = pd.Series(scores)
+# --- 게임 기록 재생 (리플레이) ---
+# 압축 게임 기록 = seed + 행동 목록. 주사위는 seed로 다시 만들어 내므로 저장하지 않는다.
+#   [버전 1B][seed 값 개수 1B]([길이 1B][정수 little-endian])*  [턴 12개 × 2B][최종 점수 2B]
+#   턴 2바이트 = 족보 인덱스(4bit) | 재굴림 결정 수(2bit) | 1차 마스크(5bit) | 2차 마스크(5bit)
+# 마스크는 '정렬된 주사위' 기준이며 31(모두 고정)은 굴림 중단이다.
+GAME_RECORD_VERSION = 1
+KEEP_ALL_MASK = 0b11111
+
+class ReplayError(ValueError):
+    pass
+
+def encode_game_record(seed_entropy, turns, total_score):
+    entropy = [int(e) for e in (seed_entropy if isinstance(seed_entropy, (list, tuple)) else [seed_entropy])]
+    out = bytearray([GAME_RECORD_VERSION, len(entropy)])
+    for e in entropy:
+        raw = e.to_bytes(max(1, (e.bit_length() + 7) // 8), 'little')
+        out.append(len(raw))
+        out += raw
+    for masks, category in turns:
+        word = CATEGORIES.index(category) | len(masks) << 4
+        for i, mask in enumerate(masks):
+            word |= mask << (6 + 5 * i)
+        out += word.to_bytes(2, 'little')
+    out += int(total_score).to_bytes(2, 'little')
+    return bytes(out)
+
+def decode_game_record(data):
+    """(seed 값 리스트, [(마스크 목록, 족보), ...], 최종 점수)를 반환"""
+    if len(data) < 2 or data[0] != GAME_RECORD_VERSION:
+        raise ReplayError("지원하지 않는 게임 기록 형식입니다")
+    pos, entropy = 2, []
+    for _ in range(data[1]):
+        if pos >= len(data) or pos + 1 + data[pos] > len(data):
+            raise ReplayError("게임 기록이 seed 머리글에서 잘렸습니다")
+        size = data[pos]
+        entropy.append(int.from_bytes(data[pos + 1:pos + 1 + size], 'little'))
+        pos += 1 + size
+    if len(data) - pos != 12 * 2 + 2:
+        raise ReplayError("게임 기록의 길이가 맞지 않습니다")
+    turns = []
+    for t in range(12):
+        word = int.from_bytes(data[pos + 2 * t:pos + 2 * t + 2], 'little')
+        cat_index, n = word & 0xF, word >> 4 & 0b11
+        if cat_index >= len(CATEGORIES) or n > 2:
+            raise ReplayError(f"{t + 1}턴: 잘못된 행동 코드입니다")
+        turns.append(([word >> (6 + 5 * i) & KEEP_ALL_MASK for i in range(n)], CATEGORIES[cat_index]))
+    return entropy, turns, int.from_bytes(data[-2:], 'little')
+
+def replay_game(data):
+    """압축 기록을 seed부터 다시 재생하며 모든 중간 상태를 규칙대로 검증하고 점수판을 복원한다.
+    같은 족보 재사용, 굴림 중단 뒤의 결정, 기록된 최종 점수와의 불일치는 ReplayError."""
+    entropy, turns, recorded_total = decode_game_record(data)
+    ds = DiceSource(entropy)
+    scoreboard = {c: None for c in CATEGORIES}
+    for turn, (masks, category) in enumerate(turns, 1):
+        dice = sorted(ds.roll(5))
+        for i, mask in enumerate(masks):
+            if mask == KEEP_ALL_MASK:
+                if i != len(masks) - 1:
+                    raise ReplayError(f"{turn}턴: 굴림을 멈춘 뒤에 재굴림 결정이 있습니다")
+                break
+            kept = [d for j, d in enumerate(dice) if mask >> j & 1]
+            dice = sorted(kept + ds.roll(5 - len(kept)))
+        if scoreboard[category] is not None:
+            raise ReplayError(f"{turn}턴: 이미 기록한 족보 {category}를 다시 골랐습니다")
+        scoreboard[category] = score_category(dice, category)
+    total = sum(scoreboard.values()) + calculate_bonus(calculate_upper_score(scoreboard))
+    if total != recorded_total:
+        raise ReplayError(f"재생한 최종 점수 {total}점이 기록된 {recorded_total}점과 다릅니다")
+    return scoreboard, total
+
+def record_simulated_game(cpu_type, seed_entropy, config=None):
+    """seed로 게임 한 판을 시뮬레이션하고 압축 게임 기록(bytes)을 반환"""
+    actions = []
+    total = run_single_game_simulation(cpu_type, config, DiceSource(seed_entropy), actions=actions)
+    return encode_game_record(seed_entropy, actions, total)
+
+def write_game_records(path, records):
+    """게임 기록들을 [길이 2B][기록] 형태로 이어 붙여 저장"""
+    with open(path, 'wb') as f:
+        for data in records:
+            f.write(len(data).to_bytes(2, 'little'))
+            f.write(data)
+
+def read_game_records(path):
+    with open(path, 'rb') as f:
+        blob = f.read()
+    pos = 0
+    while pos < len(blob):
+        size = int.from_bytes(blob[pos:pos + 2], 'little')
+        yield blob[pos + 2:pos + 2 + size]
+        pos += 2 + size
+
+def _replay_chunk_task(chunk):
+    bad = []
+    for index, data in chunk:
+        try:
+            replay_game(data)
+        except ReplayError as e:
+            bad.append((index, str(e)))
+        except (ValueError, IndexError, KeyError, TypeError) as e:
+            # 검사에서 빠진 손상도 그 기록 하나의 실패로만 센다 (풀 전체가 멈추지 않도록)
+            bad.append((index, f"게임 기록을 해석할 수 없습니다: {type(e).__name__}: {e}"))
+    return len(chunk), bad
+
+def verify_game_records(path, workers=None, chunk_size=2000):
+    """기록 파일의 모든 게임을 병렬로 재생·검증하고 (검증 수, 실패 목록)을 반환"""
+    records = list(enumerate(read_game_records(path)))
+    chunks = [records[i:i + chunk_size] for i in range(0, len(records), chunk_size)]
+    checked, failures = 0, []
+    start = time.perf_counter()
+    with multiprocessing.Pool(workers or os.cpu_count() or 1) as pool:
+        for n, bad in pool.imap_unordered(_replay_chunk_task, chunks):
+            checked += n
+            failures.extend(bad)
+    elapsed = time.perf_counter() - start
+    print(f"🔁 리플레이 검증: {checked}게임 중 실패 {len(failures)}개 | {elapsed:.1f}초, "
+          f"{checked / max(elapsed, 1e-9) * 60:,.0f} 게임/분")
+    for index, reason in sorted(failures)[:20]:
+        print(f"  ⚠️ #{index}: {reason}")
+    return checked, failures
+
+# --- 점수 통계 집계 ---
+class ScoreStats:
+    """최종 점수 히스토그램으로 통계를 모으는 집계기.
+    병합 순서와 무관하게 같은 결과가 나오므로 배치/워커별 부분 결과를 합치기 쉽다."""
+
+    def __init__(self, hist=None):
+        self.hist = Counter()
+        for score, n in (hist or {}).items():
+            self.hist[int(score)] += n
+
+    def add(self, score):
+        self.hist[score] += 1
+
+    def merge(self, other):
+        self.hist.update(other.hist)
+        return self
+
+    @property
+    def count(self):
+        return sum(self.hist.values())
+
+    def mean(self):
+        return sum(s * n for s, n in self.hist.items()) / self.count
+
+    def std(self):
+        """표본 표준편차 (pandas의 std와 같은 n-1 기준)"""
+        n = self.count
+        if n < 2:
+            return 0.0
+        mean = self.mean()
+        return math.sqrt(sum(c * (s - mean) ** 2 for s, c in self.hist.items()) / (n - 1))
+
+    def to_dict(self):
+        return {str(s): n for s, n in sorted(self.hist.items())}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data)
+
+    def to_series(self):
+        scores = sorted(self.hist)
+        return pd.Series(np.repeat(scores, [self.hist[s] for s in scores]))
+
+def game_seed(seed, game_index):
+    """게임별 주사위 seed. 배치 크기나 실행 위치와 무관하게 game_index만으로 정해진다."""
+    return [seed, game_index]
+
+# 진행 표시용 완료 게임 카운터(multiprocessing.Value). 풀 워커는 _init_progress_worker로 받는다.
+_progress_counter = None
+
+def run_simulation_batch(cpu_type, seed, start, count, config=None, trace=None, progress=None):
+    """start번째부터 count개의 게임을 seed 기반으로 시뮬레이션해 ScoreStats로 반환.
+    progress(공유 카운터)가 있으면 게임이 끝날 때마다 1씩 올린다."""
+    progress = progress if progress is not None else _progress_counter
+    stats = ScoreStats()
+    for g in range(start, start + count):
+        stats.add(run_single_game_simulation(cpu_type, config, DiceSource(game_seed(seed, g)), trace))
+        if progress is not None:
+            with progress.get_lock():
+                progress.value += 1
+    flush_policy_caches()
+    return stats
+
+def _simulation_batch_task(args):
+    return run_simulation_batch(*args)
+
+def _ignore_sigint():
+    # Ctrl+C는 메인 프로세스만 받아서 체크포인트를 남기고 풀을 정리한다
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+def _init_progress_worker(counter):
+    global _progress_counter
+    _progress_counter = counter
+    _ignore_sigint()
+
+def format_duration(seconds):
+    if seconds == float("inf"):
+        return "--:--:--"
+    seconds = int(seconds)
+    return f"{seconds // 3600:d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+class ProgressReporter:
+    """interval초마다 한 번 진행 상황(완료 수, 처리량, 남은 시간, 평균 점수와 95% 신뢰구간)을
+    한 줄로 갱신해 출력한다. start(games_done)로 타이머를 켜면 배치가 끝나기를 기다리지 않고
+    일정한 간격으로 출력하며, 완료 게임 수는 games_done()에서, 평균 점수는 update()로 넘겨받은
+    마지막 집계(끝난 배치까지)에서 가져온다."""
+
+    def __init__(self, total, done=0, interval=2.0):
+        self.total = total
+        self.interval = interval
+        self._start_done = done
+        self._start = time.perf_counter()
+        self._next = self._start + interval
+        self._snapshot = ScoreStats()
+        self._stop = None
+        self._thread = None
+
+    def _print(self, done, stats):
+        if done == 0:
+            return
+        rate = (done - self._start_done) / max(time.perf_counter() - self._start, 1e-9)
+        eta = (self.total - done) / rate if rate > 0 else float("inf")
+        if stats.count:
+            summary = f"평균 {stats.mean():.2f} ± {1.96 * stats.std() / math.sqrt(stats.count):.2f}점 (95% CI)"
+        else:
+            summary = "평균 -"
+        print(f"\r  진행: {done}/{self.total}회 ({100 * done / self.total:.1f}%) | {rate:.1f} 게임/초 | "
+              f"남은 시간 {format_duration(eta)} | {summary}", end="", flush=True)
+
+    def start(self, games_done=None):
+        """interval초마다 출력하는 타이머 스레드를 켠다. games_done이 없으면 마지막 집계의 게임 수를 쓴다."""
+        self._stop = threading.Event()
+
+        def run():
+            while not self._stop.wait(self.interval):
+                snapshot = self._snapshot
+                self._print(games_done() if games_done is not None else snapshot.count, snapshot)
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def update(self, stats, force=False):
+        if self._thread is not None:
+            # 타이머 스레드가 집계 도중의 stats를 읽지 않도록 사본을 넘긴다
+            self._snapshot = ScoreStats(stats.hist)
+            return
+        now = time.perf_counter()
+        if not force and now < self._next:
+            return
+        self._next = now + self.interval
+        self._print(stats.count, stats)
+
+    def finish(self, stats):
+        self.stop()
+        self.update(stats, force=True)
+        print()
+
+def print_score_statistics(stats):
+    scores_series = stats.to_series()
     print("\n--- 📊 통계 결과 ---")
     print(f"평균 점수  : {scores_series.mean():.2f}점")
     print(f"중앙값      : {scores_series.median():.2f}점")
@@ -433,41 +1757,1865 @@ def analyze_cpu_performance(cpu_type, num_simulations=100):
         print("최빈값      : 없음")
     print("--------------------")
 
-def save_all_logs(player_logs):
+# --- 버전별 성능 회귀 리포트 ---
+# 모든 버전의 에이전트를 같은 seed의 게임으로 돌려 강함(점수)과 비용(결정 지연, 처리량)을 나란히 비교한다.
+# 지연을 재야 하므로 병렬 워커 없이 한 프로세스에서 순서대로 둔다.
+class TimedAgent(Agent):
+    """다른 에이전트를 감싸 결정 하나마다 걸린 시간(초)을 latencies에 모은다"""
+
+    def __init__(self, agent):
+        super().__init__(agent.config)
+        self.agent = agent
+        self.name = agent.name
+        self.latencies = []
+
+    def choose_keep(self, dice, scoreboard, turn, rolls_left=2, dice_source=None, opponents=None):
+        start = time.perf_counter()
+        keep = self.agent.choose_keep(dice, scoreboard, turn, rolls_left, dice_source, opponents)
+        self.latencies.append(time.perf_counter() - start)
+        return keep
+
+    def choose_category(self, dice, scoreboard, turn, opponents=None):
+        start = time.perf_counter()
+        choice = self.agent.choose_category(dice, scoreboard, turn, opponents)
+        self.latencies.append(time.perf_counter() - start)
+        return choice
+
+def benchmark_agent(name, games, seed=0, config=None, time_budget=None):
+    """에이전트 하나로 seed의 0번부터 games개 게임을 두고 점수/지연/처리량을 잰다.
+    time_budget(초)을 넘기면 거기까지 둔 게임(같은 seed의 앞쪽 게임들)만으로 집계한다."""
+    config = config or ANALYSIS_GAME_CONFIG
+    agent = TimedAgent(create_agent(name, config))
+    stats = ScoreStats()
+    start = time.perf_counter()
+    for g in range(games):
+        stats.add(run_single_game_simulation(agent, config, DiceSource(game_seed(seed, g))))
+        if time_budget is not None and time.perf_counter() - start >= time_budget:
+            break
+    elapsed = time.perf_counter() - start
+    latencies = np.array(agent.latencies) * 1000
+    return {
+        "에이전트": name,
+        "게임": stats.count,
+        "평균": stats.mean(),
+        "표준편차": stats.std(),
+        "지연 평균(ms)": latencies.mean(),
+        "지연 p99(ms)": np.percentile(latencies, 99),
+        "게임/초": stats.count / elapsed,
+    }
+
+def version_report(names=None, games=20, seed=0, time_budget=None, config=None, csv_path=None):
+    """names(기본: 레지스트리의 모든 에이전트)를 차례로 벤치마크해 표로 출력하고 DataFrame을 돌려준다"""
+    rows = []
+    for name in names or agent_names():
+        print(f"⏱️ [{name}] 측정 중...")
+        rows.append(benchmark_agent(name, games, seed, config, time_budget))
+    report = pd.DataFrame(rows)
+    print(f"\n===== 버전별 성능 리포트 (seed={seed}, 최대 {games}게임) =====")
+    print(report.to_string(index=False, float_format=lambda v: f"{v:.2f}"))
+    if time_budget is not None and (report["게임"] < games).any():
+        print(f"※ 게임 수가 {games}보다 적은 에이전트는 시간 제한({time_budget:g}초)에 걸려 앞쪽 seed만 두었습니다.")
+    if csv_path:
+        report.to_csv(csv_path, index=False, encoding='utf-8-sig')
+        print(f"💾 리포트 저장 완료: {csv_path}")
+    return report
+
+# --- CPU 리그 (라운드 로빈 + Elo) ---
+# 참가 에이전트의 모든 조합을 다인전으로 맞붙인다. 자리 k의 주사위는 (seed, 라운드, k)로 정해지고, 같은 seed로
+# 자리를 한 칸씩 돌려 가며 두므로 모든 참가자가 같은 주사위 흐름을 번갈아 받는다 (자리 순환 + 짝지은 seed).
+# 결과는 제출 순서대로 받아 하나씩 반영하므로 워커 수와 무관하게 같은 순위가 나온다.
+LEAGUE_ELO_START = 1500.0
+LEAGUE_ELO_K = 8.0  # 수천 대국을 잇달아 반영하므로 작게 두어 마지막 몇 판에 순위가 흔들리지 않게 한다
+
+def play_agent_turn(agent, dice_source, scoreboard, turn, ai_source=None, opponents=None):
+    """에이전트의 한 턴(굴림 최대 3번 + 족보 기록)을 진행하고 (최종 주사위, 족보)를 반환"""
+    dice = dice_source.roll(5)
+    for rolls_left in (2, 1):
+        keep = agent.choose_keep(dice, scoreboard, turn, rolls_left, ai_source, opponents)
+        if len(keep) == 5:
+            break
+        dice = [d for i, d in enumerate(dice) if i in keep] + dice_source.roll(5 - len(keep))
+    choice = agent.choose_category(dice, scoreboard, turn, opponents)
+    if scoreboard.get(choice, 0) is not None:
+        choice = next(c for c, s in scoreboard.items() if s is None)
+    scoreboard[choice] = score_category(dice, choice)
+    return dice, choice
+
+def run_match(seats, seed, config=None):
+    """seats(에이전트 이름) 순서대로 앉혀 한 게임을 두고 자리별 최종 점수 목록을 반환"""
+    sources = [DiceSource([*seed, k]) for k in range(len(seats))]
+    ai_sources = [ds.spawn() for ds in sources]
+    agents = [get_agent(name, config) for name in seats]
+    boards = [{c: None for c in CATEGORIES} for _ in seats]
+    for turn in range(1, 13):
+        for k, agent in enumerate(agents):
+            play_agent_turn(agent, sources[k], boards[k], turn, ai_sources[k],
+                            [b for j, b in enumerate(boards) if j != k])
+    return [sum(b.values()) + calculate_bonus(calculate_upper_score(b)) for b in boards]
+
+def _league_match_task(args):
+    seats, seed, config = args
+    return seats, run_match(seats, seed, config)
+
+def league_schedule(names, rounds, players=2, seed=0):
+    """라운드마다 참가자 조합 전부 × 자리 순환. 한 라운드의 대국은 모두 같은 seed를 쓴다."""
+    return [(group[shift:] + group[:shift], [seed, r])
+            for r in range(rounds)
+            for group in itertools.combinations(names, players)
+            for shift in range(players)]
+
+class LeagueTable:
+    """대국 결과를 하나씩 받아 Elo, 상대별 승점, 점수 통계를 갱신한다.
+    다인전은 모든 두 자리 쌍의 맞대결로 나누고, 한 대국의 Elo 변화는 대국 전 점수로 한꺼번에 계산한다."""
+
+    def __init__(self, names, k=LEAGUE_ELO_K):
+        self.names = list(names)
+        self.k = k
+        self.elo = {n: LEAGUE_ELO_START for n in self.names}
+        self.points = {a: {b: 0.0 for b in self.names} for a in self.names}  # a가 b에게서 얻은 승점 (무승부 0.5)
+        self.games = {a: {b: 0 for b in self.names} for a in self.names}
+        self.scores = {n: ScoreStats() for n in self.names}
+        self.matches = 0
+
+    def add(self, seats, totals):
+        delta = dict.fromkeys(seats, 0.0)
+        for (i, a), (j, b) in itertools.combinations(enumerate(seats), 2):
+            result = 1.0 if totals[i] > totals[j] else 0.5 if totals[i] == totals[j] else 0.0
+            expected = 1.0 / (1.0 + 10 ** ((self.elo[b] - self.elo[a]) / 400.0))
+            delta[a] += self.k * (result - expected)
+            delta[b] -= self.k * (result - expected)
+            self.points[a][b] += result
+            self.points[b][a] += 1.0 - result
+            self.games[a][b] += 1
+            self.games[b][a] += 1
+        for name, d in delta.items():
+            self.elo[name] += d
+        for name, total in zip(seats, totals):
+            self.scores[name].add(total)
+        self.matches += 1
+
+    def standings(self):
+        rows = []
+        for n in self.names:
+            games = sum(self.games[n].values())
+            rows.append({"에이전트": n, "Elo": self.elo[n],
+                         "승률(%)": 100 * sum(self.points[n].values()) / games if games else float("nan"),
+                         "평균 점수": self.scores[n].mean() if self.scores[n].count else float("nan"),
+                         "대국": self.scores[n].count})
+        table = pd.DataFrame(rows).sort_values("Elo", ascending=False, ignore_index=True)
+        table.index += 1
+        return table
+
+    def win_rate_matrix(self):
+        """행 에이전트가 열 에이전트를 상대로 거둔 승률(%)"""
+        return pd.DataFrame({b: {a: 100 * self.points[a][b] / self.games[a][b] if self.games[a][b] else float("nan")
+                                 for a in self.names} for b in self.names}, index=self.names)
+
+def print_league(table):
+    print(f"\n===== 리그 순위 ({table.matches}대국) =====")
+    print(table.standings().to_string(float_format=lambda v: f"{v:.1f}"))
+    print("\n--- 상대별 승률(%) (행 → 열) ---")
+    print(table.win_rate_matrix().to_string(float_format=lambda v: f"{v:.1f}", na_rep="-"))
+
+def run_league(names=None, rounds=100, players=2, seed=0, workers=None, config=None, csv_path=None):
+    """참가자(기본: 현재 CPU 유형 전부)로 리그를 돌려 LeagueTable을 반환.
+    Ctrl+C로 멈추면 그때까지 반영된 결과를 출력한다."""
+    names = list(names or CPU_TYPES)
+    if not 2 <= players <= len(names):
+        raise ValueError(f"한 대국 인원은 2~{len(names)}명이어야 합니다.")
+    config = config or ANALYSIS_GAME_CONFIG
+    tasks = [(seats, match_seed, config) for seats, match_seed in league_schedule(names, rounds, players, seed)]
+    table = LeagueTable(names)
+    workers = workers or os.cpu_count() or 1
+    pool = multiprocessing.Pool(workers, initializer=_ignore_sigint) if workers > 1 else None
+    print(f"🏆 리그 시작: 참가 {len(names)}명, {players}인전, {len(tasks)}대국 (seed={seed}, 워커 {workers}개)")
+    start, next_report = time.perf_counter(), time.perf_counter() + 2.0
+    try:
+        results = pool.imap(_league_match_task, tasks, chunksize=4) if pool is not None \
+            else map(_league_match_task, tasks)
+        for seats, totals in results:
+            table.add(seats, totals)
+            if time.perf_counter() >= next_report:
+                next_report = time.perf_counter() + 2.0
+                leader = max(table.elo, key=table.elo.get)
+                rate = table.matches / (time.perf_counter() - start)
+                print(f"\r  진행: {table.matches}/{len(tasks)}대국 | {rate:.1f} 대국/초 | "
+                      f"선두 {leader} (Elo {table.elo[leader]:.0f})", end="", flush=True)
+        print()
+    except KeyboardInterrupt:
+        print("\n🛑 리그를 중단했습니다. 지금까지의 결과입니다.")
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+    print_league(table)
+    if csv_path:
+        table.standings().to_csv(csv_path, encoding='utf-8-sig')
+        print(f"💾 순위표 저장 완료: {csv_path}")
+    return table
+
+# --- 정확한 최종 점수 분포 ---
+# 정책이 정해지면 한 턴은 '굴림 → 고정 → 굴림' 마르코프 연쇄라서 턴 끝 주사위 조합의 확률을 바로 구할 수 있다.
+# 턴 시작 분포 = Σ(턴 끝 조합 확률 × 기록 후 상태의 분포를 얻은 점수만큼 민 것)이므로,
+# 남은 족보가 적은 마스크부터 거꾸로 채우면 (마스크, 상단 합계)별 미래 점수 분포가 정확히 나온다.
+class OptimalPolicy:
+    """가치 표를 따르는 기대 점수 최대화 정책.
+    decisions(mask, ups)는 (1차 굴림 후 고정 조합, 2차 굴림 후 고정 조합, 족보) 인덱스를
+    각각 (252, len(ups)) 배열로 돌려준다."""
+
+    def __init__(self, value_table=None):
+        self.V = load_value_table() if value_table is None else value_table
+
+    def decisions(self, mask, ups):
+        transition, sub_keeps, scores = _turn_tables()
+        values = _category_values(self.V, mask, scores, ups)
+        category = values.argmax(axis=1)
+        ek = transition @ values.max(axis=1)
+        keep2 = _best_keeps(ek, sub_keeps)
+        keep1 = _best_keeps(transition @ ek[keep2, np.arange(len(ups))], sub_keeps)
+        return keep1, keep2, category
+
+class ScoreDistribution:
+    """정확한 최종 점수 분포. probs[i] = P(최종 점수 == offset + i)"""
+
+    def __init__(self, probs, offset=0):
+        self.probs = np.asarray(probs, dtype=np.float64)
+        self.offset = int(offset)
+        self.scores = np.arange(self.offset, self.offset + len(self.probs))
+
+    def mean(self):
+        return float(self.probs @ self.scores)
+
+    def std(self):
+        return math.sqrt(max(float(self.probs @ (self.scores - self.mean()) ** 2), 0.0))
+
+    def percentile(self, q):
+        """P(점수 ≤ s) ≥ q/100 을 만족하는 가장 작은 점수 s"""
+        index = int(np.searchsorted(np.cumsum(self.probs), q / 100.0 - 1e-12))
+        return int(self.scores[min(index, len(self.scores) - 1)])
+
+    def prob_at_least(self, score):
+        return float(self.probs[max(0, score - self.offset):].sum())
+
+    def mode(self):
+        return int(self.scores[self.probs.argmax()])
+
+def _max_future_score(mask):
+    _, _, scores = _turn_tables()
+    open_cats = [c for c in range(len(CATEGORIES)) if not mask >> c & 1]
+    bonus = calculate_bonus(UPPER_CAP) if any(c < 6 for c in open_cats) else 0
+    return int(scores[:, open_cats].max(axis=0).sum()) + bonus if open_cats else 0
+
+def _reachable_ups(start_mask, start_up):
+    """시작 상태에서 도달할 수 있는 마스크별 상단 합계 집합 (64비트 비트셋)"""
+    cap_bits = (1 << (UPPER_CAP + 1)) - 1
+    reach = {start_mask: 1 << start_up}
+    for mask in range(start_mask, 1 << len(CATEGORIES)):
+        bits = reach.get(mask)
+        if bits is None:
+            continue
+        for c in range(len(CATEGORIES)):
+            if mask >> c & 1:
+                continue
+            new_bits = bits
+            if c < 6:
+                new_bits = 0
+                for k in range(6):
+                    shifted = bits << (k * (c + 1))
+                    new_bits |= (shifted & cap_bits) | ((1 << UPPER_CAP) if shifted >> UPPER_CAP else 0)
+            reach[mask | 1 << c] = reach.get(mask | 1 << c, 0) | new_bits
+    return reach
+
+def score_distribution(scoreboard, policy=None):
+    """점수판 상태에서 policy(기본: OptimalPolicy)를 따를 때 최종 점수의 정확한 분포를 계산한다.
+    시작 상태에서 도달 가능한 (마스크, 상단 합계)만 남은 족보가 적은 쪽부터 채운다."""
+    policy = policy or OptimalPolicy()
+    transition, _, scores = _turn_tables()
+    start_mask, start_up = scoreboard_state(scoreboard)
+    full_mask = (1 << len(CATEGORIES)) - 1
+    reach = _reachable_ups(start_mask, start_up)
+    first_roll = transition[KEEP_COMBO_INDEX[()]]
+    bonus = calculate_bonus(UPPER_CAP)
+    layer = {full_mask: np.ones((UPPER_CAP + 1, 1))}
+    for n_open in range(1, len(CATEGORIES) - bin(start_mask).count("1") + 1):
+        next_layer = {}
+        for mask, bits in reach.items():
+            if len(CATEGORIES) - bin(mask).count("1") != n_open:
+                continue
+            ups = np.array([u for u in range(UPPER_CAP + 1) if bits >> u & 1])
+            cols = np.arange(len(ups))
+            keep1, keep2, category = policy.decisions(mask, ups)
+            q = np.repeat(first_roll[:, None], len(ups), axis=1)
+            for keep in (keep1, keep2):
+                flat = keep * len(ups) + cols
+                mass = np.bincount(flat.ravel(), q.ravel(), len(KEEP_COMBOS) * len(ups))
+                q = transition.T @ mass.reshape(len(KEEP_COMBOS), len(ups))
+            width = _max_future_score(mask) + 1
+            out = np.zeros((UPPER_CAP + 1, width))
+            for c in range(len(CATEGORIES)):
+                if mask >> c & 1:
+                    continue
+                nxt = layer[mask | 1 << c]
+                w = np.where(category == c, q, 0.0)
+                for value in np.unique(scores[:, c]):
+                    wv = w[scores[:, c] == value].sum(axis=0)
+                    if not wv.any():
+                        continue
+                    new_up = np.minimum(ups + value, UPPER_CAP) if c < 6 else ups
+                    shift = value + np.where((ups < UPPER_CAP) & (new_up >= UPPER_CAP), bonus, 0) if c < 6 \
+                        else np.full(len(ups), value)
+                    for sh in np.unique(shift):
+                        rows = (shift == sh) & (wv > 0)
+                        n = min(nxt.shape[1], width - sh)
+                        out[ups[rows], sh:sh + n] += wv[rows, None] * nxt[new_up[rows], :n]
+            next_layer[mask] = out
+        layer = next_layer
+    return ScoreDistribution(layer[start_mask][start_up], offset=banked_score(scoreboard))
+
+def parse_scoreboard(text):
+    """'Ones=3,Four of a Kind=24,12=20' 형식(족보 이름 또는 번호)을 점수판 dict로 바꾼다"""
+    scoreboard = {c: None for c in CATEGORIES}
+    for item in filter(None, (part.strip() for part in (text or "").split(","))):
+        name, _, value = item.partition("=")
+        name = name.strip()
+        cat = CATEGORIES[int(name) - 1] if name.isdigit() and 1 <= int(name) <= len(CATEGORIES) else \
+            next((c for c in CATEGORIES if c.lower() == name.lower()), None)
+        if cat is None or not value.strip().isdigit():
+            raise ValueError(f"잘못된 점수판 항목: {item}")
+        scoreboard[cat] = int(value)
+    return scoreboard
+
+def print_exact_score_statistics(dist, title="정확한 최종 점수 분포"):
+    print(f"\n--- 🎯 {title} ---")
+    print(f"평균 점수  : {dist.mean():.2f}점")
+    print(f"중앙값      : {dist.percentile(50)}점")
+    print(f"표준 편차  : {dist.std():.2f}")
+    print(f"최빈값      : {dist.mode()}점")
+    print("백분위      : " + ", ".join(f"{q}% {dist.percentile(q)}점" for q in (1, 5, 25, 75, 95, 99)))
+    for threshold in (200, 250, 300):
+        print(f"P(≥{threshold}점) : {dist.prob_at_least(threshold):.6f}")
+    print("--------------------")
+
+def atomic_write_json(path, data):
+    """임시 파일에 쓰고 fsync 후 교체하므로, 중간에 죽어도 이전 내용이나 새 내용 중 하나만 남는다"""
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def load_analysis_checkpoint(path=ANALYSIS_CHECKPOINT_FILE):
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (json.JSONDecodeError, OSError):
+        print("⚠️ 분석 체크포인트가 손상되었습니다. 처음부터 분석합니다.")
+        return None
+
+def analyze_cpu_performance(cpu_type, num_simulations=100, trace_dir=None, seed=None,
+                            checkpoint_path=None, resume=False, batch_size=20, checkpoint_interval=30.0,
+                            workers=1, config=None):
+    """배치 단위로 게임을 시뮬레이션한다. 게임마다 (seed, 게임 번호)로 주사위가 정해지므로
+    checkpoint_path에 '완료된 배치까지의 집계 + 다음 게임 번호'를 주기적으로 저장해 두면,
+    resume=True로 다시 실행했을 때 끊기지 않은 실행과 똑같은 결과가 나온다."""
+    state = load_analysis_checkpoint(checkpoint_path) if resume and checkpoint_path else None
+    if state is not None and state.get("cpu_type") != cpu_type:
+        print("⚠️ 체크포인트의 CPU 유형이 다릅니다. 처음부터 분석합니다.")
+        state = None
+    if state is not None:
+        seed, batch_size, trace_dir = state["seed"], state["batch_size"], state.get("trace_dir")
+        config = state.get("config", config)
+        next_game, stats = state["next_game"], ScoreStats.from_dict(state["stats"])
+        trace_position = (state.get("trace_chunks", 0), state.get("trace_games", 0))
+    else:
+        seed = seed if seed is not None else np.random.SeedSequence().entropy
+        next_game, stats, trace_position = 0, ScoreStats(), (0, 0)
+
+    config = config or ANALYSIS_GAME_CONFIG
+    if cpu_type == "엘리트형" and config.get("elite_category") == "value":
+        load_value_table()  # 워커들이 동시에 계산하지 않도록 미리 만들어 둔다
+    cache = get_policy_cache(config.get("policy_cache")) if cpu_type == "엘리트형" else None
+    cache_before = cache.totals() if cache is not None else None
+    print(f"\n===== CPU 유형: [{cpu_type}] 성능 분석 =====")
+    print(f"시뮬레이션 횟수: {num_simulations}회 (seed={seed})")
+    if next_game:
+        print(f"⏯️ 체크포인트에서 이어서 분석합니다: {next_game}/{num_simulations}회 완료")
+    print("분석 중...")
+    trace = TraceRecorder(trace_dir, chunks=trace_position[0], games=trace_position[1]) if trace_dir else None
+
+    def write_checkpoint():
+        if trace is not None:
+            trace.flush()
+        atomic_write_json(checkpoint_path, {
+            "cpu_type": cpu_type, "num_simulations": num_simulations, "seed": seed,
+            "batch_size": batch_size, "next_game": next_game, "stats": stats.to_dict(),
+            "trace_dir": trace_dir, "config": config,
+            "trace_chunks": trace.chunks if trace is not None else 0,
+            "trace_games": trace.games if trace is not None else 0,
+        })
+
+    if workers > 1 and trace is not None:
+        print("⚠️ 턴 트레이스는 단일 프로세스에서만 기록합니다. 워커 1개로 분석합니다.")
+        workers = 1
+    batches = [(start, min(batch_size, num_simulations - start))
+               for start in range(next_game, num_simulations, batch_size)]
+    pool = None
+    # 워커가 게임마다 올리는 카운터로, 20게임 배치가 끝나기 전에도 진행 표시가 일정 간격으로 갱신된다
+    counter = multiprocessing.Value("q", 0)
+    if workers > 1:
+        # imap은 제출 순서대로 결과를 돌려주므로 체크포인트 커서가 항상 연속 구간을 가리킨다
+        pool = multiprocessing.Pool(workers, initializer=_init_progress_worker, initargs=(counter,))
+        results = pool.imap(_simulation_batch_task, [(cpu_type, seed, start, count, config) for start, count in batches])
+    else:
+        results = (run_simulation_batch(cpu_type, seed, start, count, config, trace, counter)
+                   for start, count in batches)
+
+    reporter = ProgressReporter(num_simulations, stats.count)
+    resumed = stats.count
+    reporter.start(lambda: resumed + counter.value)
+    last_checkpoint = time.perf_counter()
+    # (트레이스 위치, 집계, 다음 게임 번호)는 마지막으로 끝난 배치 경계의 값을 한 튜플로 함께 바꾼다.
+    # 중단되면 셋을 모두 이 값으로 되돌리므로, 트레이스와 체크포인트가 서로 다른 배치를 가리킬 일이 없다.
+    committed = (trace.mark() if trace is not None else None, stats, next_game)
+    try:
+        for start, count in batches:
+            merged = ScoreStats(stats.hist)  # 새 객체에 합쳐 두고 아래 대입 한 번으로 경계를 옮긴다
+            merged.merge(next(results))
+            committed = (trace.mark() if trace is not None else None, merged, start + count)
+            _, stats, next_game = committed
+            reporter.update(stats)
+            if checkpoint_path and time.perf_counter() - last_checkpoint >= checkpoint_interval:
+                write_checkpoint()
+                # 체크포인트가 트레이스 청크를 파일로 내보내면 위치가 바뀌므로 새로 표시한다
+                committed = (trace.mark() if trace is not None else None, stats, next_game)
+                last_checkpoint = time.perf_counter()
+        reporter.finish(stats)
+    except KeyboardInterrupt:
+        reporter.stop()
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+        # 진행 중이던 배치는 버리고 마지막으로 끝난 배치 경계까지만 저장한다
+        trace_mark, stats, next_game = committed
+        saved = bool(checkpoint_path) and (trace is None or trace.rollback(trace_mark))
+        if saved:
+            write_checkpoint()
+            print(f"\n⏸️ 분석 중단: {next_game}/{num_simulations}회까지 체크포인트에 저장되어 있습니다.")
+        elif checkpoint_path:
+            # 트레이스 청크가 이미 파일로 나가 되돌릴 수 없으면 이전 체크포인트를 그대로 둔다
+            print(f"\n⏸️ 분석 중단: {next_game}/{num_simulations}회 완료. 트레이스를 되돌릴 수 없어 "
+                  f"체크포인트는 갱신하지 않았습니다 (이어서 분석하면 이전 체크포인트부터 다시 합니다).")
+        else:
+            print(f"\n⏸️ 분석 중단: {next_game}/{num_simulations}회 완료")
+        if stats.count:
+            print_score_statistics(stats)
+        return None
+    if pool is not None:
+        pool.close()
+        pool.join()
+
+    if trace is not None:
+        trace.close()
+        print(f"🗂️ 턴 트레이스 저장 완료: {trace_dir} ({trace.chunks}개 청크)")
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    print_score_statistics(stats)
+    if cache is not None:
+        hits, misses, entries = (now - before for now, before in zip(cache.totals(), cache_before))
+        lookups = hits + misses
+        print(f"🗃️ 정책 캐시: 조회 {lookups}회 중 적중 {hits}회 ({hits / max(lookups, 1):.1%}), "
+              f"새로 저장한 상태 {entries}개 (총 {cache.totals()[2]}개)")
+    if cpu_type == "승부형":
+        # 혼자 둘 때의 승부형은 기대 점수 최적 정책이므로 표본 대신 정확한 분포와 비교할 수 있다
+        print_exact_score_statistics(score_distribution({c: None for c in CATEGORIES}),
+                                     "기대 점수 최적 정책의 정확한 분포")
+    return stats
+
+# --- 프로필 자동 튜닝 (진화 전략) ---
+# 가중치와 스칼라 상수는 로그 공간, late_turn은 턴 단위의 실수 벡터로 두고 대각 공분산 ES(CMA-ES 간소판)로 찾는다.
+# 같은 세대의 후보들은 모두 같은 게임 seed로 평가(공통 난수)하므로 점수 차이가 곧 프로필 차이다.
+# 희생 순서(sacrifice_order)는 이산값이라 일부 후보에서만 자리 바꿈/교체로 변이시킨다.
+# 도박형은 base_weights만 읽으므로 가중치 12개만 튜닝하고, 나머지 상수와 희생 순서는 엘리트형만 튜닝한다.
+# 프로필 파일에는 CPU 유형별로 따로 저장한다: {"profiles": {CPU 유형: {"generations", "games", "validation", "profile"}}}
+_TUNED_SCALARS = ("upper_boost", "urgency_decay", "late_boost")
+
+def _read_profile_entries(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if "profiles" in data:
+        entries = data["profiles"]
+    elif "cpu_type" in data:
+        entries = {data["cpu_type"]: data}  # 프로필 하나만 담던 예전 형식
+    else:
+        raise ValueError("프로필을 튜닝한 CPU 유형(cpu_type)이 기록되어 있지 않습니다")
+    unknown = [t for t in entries if t not in TUNABLE_CPU_TYPES]
+    if unknown:
+        raise ValueError(f"프로필을 적용할 수 없는 CPU 유형: {unknown}")
+    return entries
+
+def load_profiles(path):
+    """튜너가 저장한 프로필 파일을 읽어 {CPU 유형: 프로필}을 반환한다. 각 프로필은 기본 프로필 위에 덮어쓴다."""
+    profiles = {}
+    for cpu_type, entry in _read_profile_entries(path).items():
+        data = entry.get("profile", entry)
+        profile = {**DEFAULT_PROFILE, **data}
+        profile["base_weights"] = {**DEFAULT_PROFILE["base_weights"], **data.get("base_weights", {})}
+        unknown = [c for c in profile["sacrifice_order"] if c not in CATEGORIES]
+        if unknown:
+            raise ValueError(f"알 수 없는 족보: {unknown}")
+        profiles[cpu_type] = profile
+    return profiles
+
+def _profile_to_vector(profile, cpu_type):
+    x = [math.log(profile["base_weights"][c]) for c in CATEGORIES]
+    if cpu_type == "엘리트형":
+        x += [math.log(profile[k]) for k in _TUNED_SCALARS] + [float(profile["late_turn"])]
+    return np.array(x)
+
+def _vector_to_profile(x, sacrifice_order, cpu_type):
+    profile = {**DEFAULT_PROFILE, "base_weights": {c: round(math.exp(v), 4) for c, v in zip(CATEGORIES, x)},
+               "sacrifice_order": list(sacrifice_order)}
+    if cpu_type == "엘리트형":
+        profile.update({k: round(math.exp(v), 4) for k, v in zip(_TUNED_SCALARS, x[len(CATEGORIES):])})
+        profile["late_turn"] = int(min(12, max(1, round(x[-1]))))
+    return profile
+
+def _mutate_sacrifice_order(order, rng):
+    order = list(order)
+    if len(order) > 1 and rng.random() < 0.5:
+        i, j = rng.choice(len(order), 2, replace=False)
+        order[i], order[j] = order[j], order[i]
+    else:
+        order[rng.integers(len(order))] = str(rng.choice([c for c in CATEGORIES if c not in order]))
+    return order
+
+def _evaluate_profiles(cpu_type, profiles, base_config, seed, games, pool, batch_size=10):
+    """프로필들을 같은 게임 seed(공통 난수)로 평가해 평균 점수 목록을 반환"""
+    tasks, owners = [], []
+    for i, profile in enumerate(profiles):
+        config = dict(base_config, profiles={cpu_type: profile})
+        for start in range(0, games, batch_size):
+            tasks.append((cpu_type, seed, start, min(batch_size, games - start), config))
+            owners.append(i)
+    stats = [ScoreStats() for _ in profiles]
+    results = pool.imap(_simulation_batch_task, tasks) if pool is not None else map(_simulation_batch_task, tasks)
+    for i, batch_stats in zip(owners, results):
+        stats[i].merge(batch_stats)
+    return [st.mean() for st in stats]
+
+def tune_profile(cpu_type, generations=20, population=12, games=200, seed=0, workers=None,
+                 checkpoint_path=TUNER_CHECKPOINT_FILE, resume=False, out_path=PROFILE_FILE, elite_n_sim=100):
+    """cpu_type(엘리트형/도박형)의 프로필 상수를 진화 전략으로 튜닝하고 가장 좋은 프로필을 out_path에 저장한다.
+    out_path에 다른 CPU 유형의 프로필이 있으면 그대로 두고 이 유형의 항목만 바꾼다.
+    세대마다 체크포인트를 남기며, 세대별 난수는 (seed, 세대)로만 정해지므로 이어서 실행해도 결과가 같다.
+    엘리트형은 평가 비용 때문에 몬테카를로 횟수를 elite_n_sim으로 줄여 평가한다."""
+    base_config = dict(ANALYSIS_GAME_CONFIG, elite_n_sim=elite_n_sim)
+    state = load_analysis_checkpoint(checkpoint_path) if resume else None
+    initial = _profile_to_vector(DEFAULT_PROFILE, cpu_type)
+    if state is not None and (state.get("cpu_type") != cpu_type or len(state["mean"]) != len(initial)):
+        print("⚠️ 튜닝 체크포인트의 CPU 유형(또는 튜닝 항목)이 다릅니다. 처음부터 튜닝합니다.")
+        state = None
+    if state is None:
+        scale = [0.2] * len(initial)
+        if cpu_type == "엘리트형":
+            scale[-1] = 1.0  # late_turn은 턴 단위
+        state = {"cpu_type": cpu_type, "seed": seed, "generation": 0, "mean": initial.tolist(),
+                 "scale": scale, "sigma": 1.0,
+                 "sacrifice_order": list(DEFAULT_PROFILE["sacrifice_order"]), "history": []}
+    seed = state["seed"]
+    mu = population // 2
+    weights = np.log(mu + 0.5) - np.log(np.arange(1, mu + 1))
+    weights /= weights.sum()
+
+    print(f"\n===== [{cpu_type}] 프로필 튜닝: 세대 {generations}, 후보 {population}개, 후보당 {games}게임 (seed={seed}) =====")
+    pool = multiprocessing.Pool(workers or os.cpu_count() or 1, initializer=_ignore_sigint)
+    try:
+        while state["generation"] < generations:
+            gen = state["generation"]
+            started = time.perf_counter()
+            rng = np.random.default_rng([seed, gen])
+            mean, scale, sigma = np.array(state["mean"]), np.array(state["scale"]), state["sigma"]
+            samples = [mean] + [mean + sigma * scale * rng.standard_normal(len(mean)) for _ in range(population)]
+            orders = [state["sacrifice_order"]] + [
+                _mutate_sacrifice_order(state["sacrifice_order"], rng)
+                if cpu_type == "엘리트형" and rng.random() < 0.3 else state["sacrifice_order"]
+                for _ in range(population)]
+            profiles = [_vector_to_profile(x, order, cpu_type) for x, order in zip(samples, orders)]
+            game_seed_base = int(np.random.SeedSequence([seed, gen]).generate_state(1)[0])
+            fitness = _evaluate_profiles(cpu_type, profiles, base_config, game_seed_base, games, pool)
+
+            # 0번(현재 평균)은 기준점. 나머지 중 상위 mu개로 평균/대각 분산을 갱신하고, 성공률로 보폭을 조절한다
+            ranked = sorted(range(1, population + 1), key=lambda i: -fitness[i])[:mu]
+            chosen = np.array([samples[i] for i in ranked])
+            new_mean = weights @ chosen
+            steps = (chosen - mean) / (sigma * scale)
+            scale = scale * np.sqrt(0.7 + 0.3 * (weights @ steps ** 2))
+            success = sum(f > fitness[0] for f in fitness[1:]) / population
+            state.update({
+                "generation": gen + 1, "mean": new_mean.tolist(), "scale": scale.tolist(),
+                "sigma": sigma * math.exp((success - 0.2) / 0.8 * 0.5),
+                "sacrifice_order": orders[ranked[0]] if fitness[ranked[0]] > fitness[0] else state["sacrifice_order"],
+            })
+            state["history"].append({"generation": gen + 1, "baseline": fitness[0], "best": fitness[ranked[0]],
+                                     "best_profile": profiles[ranked[0]]})
+            atomic_write_json(checkpoint_path, state)
+            print(f"  세대 {gen + 1}/{generations}: 현재 평균 {fitness[0]:.2f}점 → 최고 후보 {fitness[ranked[0]]:.2f}점 "
+                  f"(σ={state['sigma']:.3f}, {format_duration(time.perf_counter() - started)})")
+
+        # 마지막 평균 프로필과 기본 프로필을 새 게임 seed로 다시 비교해 과적합 여부를 확인한다
+        best = _vector_to_profile(np.array(state["mean"]), state["sacrifice_order"], cpu_type)
+        validation_seed = int(np.random.SeedSequence([seed, generations, 1]).generate_state(1)[0])
+        tuned, baseline = _evaluate_profiles(cpu_type, [best, DEFAULT_PROFILE], base_config, validation_seed, games, pool)
+    except KeyboardInterrupt:
+        pool.terminate()
+        pool.join()
+        print(f"\n⏸️ 튜닝 중단: {state['generation']}/{generations}세대까지 체크포인트({checkpoint_path})에 저장되어 있습니다.")
+        return None
+    pool.close()
+    pool.join()
+
+    try:
+        entries = _read_profile_entries(out_path)
+    except (OSError, ValueError):
+        entries = {}
+    entries[cpu_type] = {"generations": generations, "games": games,
+                         "validation": {"tuned": tuned, "default": baseline}, "profile": best}
+    atomic_write_json(out_path, {"profiles": entries})
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    print(f"✅ 검증 {games}게임: 기본 프로필 {baseline:.2f}점 → 튜닝 프로필 {tuned:.2f}점")
+    print(f"💾 [{cpu_type}] 프로필 저장: {out_path}")
+    return best
+
+# --- 분산 시뮬레이션 (코디네이터/워커) ---
+# 코디네이터와 워커는 TCP 위에서 한 줄에 JSON 하나를 주고받는다. pickle을 쓰지 않으므로 받은 데이터로
+# 코드가 실행될 일은 없다. 접속하면 양쪽이 상대의 난수(nonce)에 공유 키 HMAC으로 답해 서로를 확인한다.
+# 키에는 기본값이 없다. 코디네이터에 --authkey를 주지 않으면 무작위 키를 만들어 출력한다.
+MAX_MESSAGE_BYTES = 1 << 20
+AUTH_TIMEOUT = 10.0
+
+class AuthenticationError(ConnectionError):
+    pass
+
+class JsonConnection:
+    """소켓 위의 줄 단위 JSON 메시지 연결"""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self._reader = sock.makefile('rb')
+
+    def send(self, message):
+        self.sock.sendall((json.dumps(message) + "\n").encode('utf-8'))
+
+    def recv(self, timeout=None):
+        """메시지 하나를 받는다. 연결이 끊기면 EOFError, timeout초 안에 안 오면 TimeoutError"""
+        self.sock.settimeout(timeout)
+        line = self._reader.readline(MAX_MESSAGE_BYTES + 1)
+        if not line:
+            raise EOFError
+        if not line.endswith(b"\n"):
+            raise ValueError("메시지가 너무 길거나 잘렸습니다.")
+        return json.loads(line)
+
+    def close(self):
+        self._reader.close()
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def _auth_digest(authkey, role, nonce):
+    # 역할 이름을 섞어서, 상대가 내 질문을 그대로 되돌려 보내 내 답을 얻어 가는 것(반사 공격)을 막는다
+    return hmac.new(authkey, f"{role}:{nonce}".encode('utf-8'), hashlib.sha256).hexdigest()
+
+def authenticate(conn, authkey, role, peer_role):
+    """상호 인증. 실패하면 AuthenticationError"""
+    nonce = secrets.token_hex(16)
+    try:
+        conn.send({"nonce": nonce})
+        peer_nonce = conn.recv(AUTH_TIMEOUT)["nonce"]
+        if not isinstance(peer_nonce, str):
+            raise TypeError
+        conn.send({"digest": _auth_digest(authkey, role, peer_nonce)})
+        digest = conn.recv(AUTH_TIMEOUT)["digest"]
+        if not isinstance(digest, str) or not hmac.compare_digest(digest, _auth_digest(authkey, peer_role, nonce)):
+            raise AuthenticationError("인증 실패: 접속 키가 다릅니다.")
+    except (KeyError, TypeError, ValueError) as e:
+        raise AuthenticationError(f"인증 실패: 잘못된 응답 ({e!r})") from None
+
+def parse_address(text, default_host="127.0.0.1"):
+    """'host:port' 또는 'port' 문자열을 (host, port)로 변환"""
+    host, _, port = text.rpartition(":")
+    return (host or default_host, int(port))
+
+def run_worker(address, authkey):
+    """코디네이터에 접속해 배치를 받아 시뮬레이션하고 부분 통계를 돌려준다"""
+    with JsonConnection(socket.create_connection(address)) as conn:
+        authenticate(conn, authkey, "worker", "coordinator")
+        while True:
+            try:
+                batch = conn.recv()
+            except EOFError:
+                break
+            if batch is None:
+                break
+            stats = run_simulation_batch(str(batch["cpu_type"]), batch["seed"], int(batch["start"]), int(batch["count"]))
+            conn.send({"batch_id": batch["batch_id"], "stats": stats.to_dict()})
+
+class SimulationCoordinator:
+    """seed가 정해진 배치를 TCP로 워커에게 나눠주고, 도착하는 부분 통계를 합친다.
+    연결이 끊기거나 batch_timeout 안에 답이 없는 워커의 배치는 다시 대기열로 돌린다."""
+
+    def __init__(self, cpu_type, num_games, seed, batch_size=20, batch_timeout=3600.0):
+        self.cpu_type = cpu_type
+        self.seed = seed
+        self.batch_timeout = batch_timeout
+        self.pending = [{"batch_id": i, "cpu_type": cpu_type, "seed": seed,
+                         "start": start, "count": min(batch_size, num_games - start)}
+                        for i, start in enumerate(range(0, num_games, batch_size))]
+        self.pending.reverse()
+        self.total_batches = len(self.pending)
+        self.done_batches = set()
+        self.stats = ScoreStats()
+        self.reassigned = 0
+        self.progress = ProgressReporter(num_games)
+        self._lock = threading.Condition()
+
+    def _next_batch(self):
+        with self._lock:
+            while not self.pending and len(self.done_batches) < self.total_batches:
+                self._lock.wait(1.0)
+            return self.pending.pop() if self.pending else None
+
+    def _serve(self, conn):
+        batch = None
+        try:
+            while True:
+                batch = self._next_batch()
+                if batch is None:
+                    conn.send(None)
+                    return
+                conn.send(batch)
+                result = conn.recv(self.batch_timeout)
+                if result.get("batch_id") != batch["batch_id"]:
+                    raise ValueError("다른 배치의 결과입니다.")
+                partial = ScoreStats({int(score): int(n) for score, n in result["stats"].items()})
+                with self._lock:
+                    if result["batch_id"] not in self.done_batches:
+                        self.done_batches.add(result["batch_id"])
+                        self.stats.merge(partial)
+                        if self.progress is not None:
+                            self.progress.update(self.stats)
+                    self._lock.notify_all()
+                batch = None
+        except (EOFError, OSError, KeyError, TypeError, ValueError, AttributeError):
+            # 끊김/시간 초과(TimeoutError는 OSError)/형식이 틀린 결과: 배치를 다른 워커에게 돌린다
+            if batch is not None:
+                with self._lock:
+                    self.pending.append(batch)
+                    self.reassigned += 1
+                    self._lock.notify_all()
+        finally:
+            conn.close()
+
+    def _accept(self, sock):
+        conn = JsonConnection(sock)
+        try:
+            authenticate(conn, self.authkey, "coordinator", "worker")
+        except (OSError, EOFError):  # AuthenticationError 포함
+            conn.close()
+            return
+        self._serve(conn)
+
+    def run(self, address, authkey, local_workers=0):
+        self.authkey = authkey
+        with socket.create_server(address) as listener:
+            bound = listener.getsockname()[:2]
+            print(f"🛰️ 코디네이터 대기 중: {bound[0]}:{bound[1]} (배치 {self.total_batches}개)")
+            procs = [multiprocessing.Process(target=run_worker, args=(bound, authkey), daemon=True)
+                     for _ in range(local_workers)]
+            for p in procs:
+                p.start()
+
+            def accept_loop():
+                while True:
+                    try:
+                        sock, _ = listener.accept()
+                    except OSError:
+                        return
+                    threading.Thread(target=self._accept, args=(sock,), daemon=True).start()
+
+            threading.Thread(target=accept_loop, daemon=True).start()
+            self.progress.start()
+            with self._lock:
+                while len(self.done_batches) < self.total_batches:
+                    self._lock.wait(1.0)
+                self.progress.finish(self.stats)
+            for p in procs:
+                p.join(timeout=5)
+        return self.stats
+
+# --- 멀티 테이블 게임 서버 (asyncio) ---
+# TCP 연결 하나 = 게임 테이블 하나(사람 1 vs CPU 1). 메시지는 한 줄에 JSON 하나(UTF-8, '\n' 구분).
+#   클라이언트 → 서버: {"op": "new", "name": "...", "cpu": "엘리트형", "seed": 123(선택)}
+#                      {"op": "keep", "keep": [고정할 인덱스]}   나머지 주사위 재굴림
+#                      {"op": "score", "category": "Chance"}      족보 기록 → CPU 턴 진행
+#   서버 → 클라이언트: {"event": "roll"|"cpu_turn"|"game_over"|"error", ...}
+# 느린 에이전트(blocking)의 결정은 프로세스 풀에서 계산하므로, 한 테이블의 몬테카를로가 다른 테이블의 응답을 막지 않는다.
+# 여러 워커 프로세스가 같은 sqlite 파일에 쓰지 않도록 서버에서는 엘리트형 결정 캐시를 끈다.
+SERVER_GAME_CONFIG = dict(DEFAULT_GAME_CONFIG, policy_cache=None)
+DEFAULT_SERVER_ADDRESS = "127.0.0.1:5056"
+SERVER_MESSAGE_LIMIT = 1 << 16  # 한 줄(메시지 하나)의 최대 바이트 수. 넘으면 오류를 알리고 연결을 닫는다
+_server_worker_config = None
+
+def _init_server_worker(config):
+    global _server_worker_config
+    _server_worker_config = config
+    _ignore_sigint()
+
+def _server_decision_task(args):
+    name, method, call_args = args
+    return getattr(get_agent(name, _server_worker_config), method)(*call_args)
+
+class GameTable:
+    """서버의 게임 테이블 하나. 주사위와 규칙 판정은 모두 서버 쪽에서 한다."""
+
+    def __init__(self, human_name, cpu_name, seed=None):
+        seeds = seed if isinstance(seed, list) else [seed]
+        if seed is not None and not (seeds and all(type(v) is int and v >= 0 for v in seeds)):
+            raise ValueError("seed는 0 이상의 정수나 그런 정수의 목록이어야 합니다.")
+        self.human_name, self.cpu_name = human_name, cpu_name
+        self.ds = DiceSource(seed)
+        self.scoreboard = {c: None for c in CATEGORIES}
+        self.cpu_scoreboard = {c: None for c in CATEGORIES}
+        self.turn = 0
+        self.start_turn()
+
+    def start_turn(self):
+        self.turn += 1
+        self.dice = self.ds.roll(5)
+        self.rolls_left = 2
+
+    @property
+    def finished(self):
+        return all(v is not None for v in self.cpu_scoreboard.values())
+
+    def keep(self, keep_idxs):
+        if self.rolls_left == 0:
+            raise ValueError("남은 굴림이 없습니다. 족보를 선택하세요.")
+        if not isinstance(keep_idxs, list) or not all(isinstance(i, int) and 0 <= i < 5 for i in keep_idxs):
+            raise ValueError("keep은 0~4 사이 인덱스 목록이어야 합니다.")
+        self.ds.reroll(self.dice, [i for i in range(5) if i not in keep_idxs])
+        self.rolls_left -= 1
+
+    def score(self, category):
+        if not isinstance(category, str) or self.scoreboard.get(category, 0) is not None:
+            raise ValueError(f"기록할 수 없는 족보입니다: {category}")
+        self.scoreboard[category] = score_category(self.dice, category)
+        return self.scoreboard[category]
+
+    async def play_cpu_turn(self, decide):
+        """decide(method, *args)는 에이전트 결정을 돌려주는 코루틴"""
+        sb, opponents = self.cpu_scoreboard, [self.scoreboard]
+        dice = self.ds.roll(5)
+        for rolls_left in (2, 1):
+            keep = await decide("choose_keep", dice, sb, self.turn, rolls_left, None, opponents)
+            if len(keep) == 5:
+                break
+            dice = [d for i, d in enumerate(dice) if i in keep] + self.ds.roll(5 - len(keep))
+        choice = await decide("choose_category", dice, sb, self.turn, opponents)
+        if sb.get(choice, 0) is not None:
+            choice = next(c for c, s in sb.items() if s is None)
+        sb[choice] = score_category(dice, choice)
+        return {"event": "cpu_turn", "turn": self.turn, "dice": dice, "category": choice, "score": sb[choice]}
+
+    def state_message(self):
+        return {"event": "roll", "turn": self.turn, "dice": self.dice, "rolls_left": self.rolls_left,
+                "scoreboard": self.scoreboard, "cpu_scoreboard": self.cpu_scoreboard,
+                "possible": {c: score_category(self.dice, c) for c, s in self.scoreboard.items() if s is None}}
+
+    def final_message(self):
+        def total(sb):
+            return sum(sb.values()) + calculate_bonus(calculate_upper_score(sb))
+        return {"event": "game_over", "scores": {self.human_name: total(self.scoreboard),
+                                                 self.cpu_name: total(self.cpu_scoreboard)}}
+
+class TableServer:
+    """여러 게임 테이블을 한 이벤트 루프에서 돌리는 asyncio 서버"""
+
+    def __init__(self, workers=None, config=None):
+        self.config = config or SERVER_GAME_CONFIG
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = concurrent.futures.ProcessPoolExecutor(self.workers, initializer=_init_server_worker,
+                                                           initargs=(self.config,))
+        self.tables = 0
+
+    async def decide(self, agent, method, *args):
+        if not agent.blocking:
+            return getattr(agent, method)(*args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.pool, _server_decision_task, (agent.name, method, args))
+
+    async def handle(self, reader, writer):
+        async def send(message):
+            writer.write((json.dumps(message, ensure_ascii=False) + "\n").encode('utf-8'))
+            await writer.drain()
+
+        table = agent = None
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, asyncio.LimitOverrunError):
+                    # 한도를 넘은 줄은 이미 일부만 버려져 뒤따르는 바이트를 믿을 수 없으므로 연결을 닫는다
+                    await send({"event": "error", "message": f"메시지가 너무 깁니다 (최대 {SERVER_MESSAGE_LIMIT}바이트)."})
+                    break
+                if not line:
+                    break
+                try:
+                    msg = json.loads(line)
+                    if not isinstance(msg, dict):
+                        raise ValueError("메시지는 JSON 객체여야 합니다.")
+                    op = msg.get("op")
+                    if op == "new":
+                        cpu = msg.get("cpu", CPU_TYPES[0])
+                        if cpu not in agent_names():
+                            raise ValueError(f"알 수 없는 에이전트: {cpu}")
+                        agent = get_agent(cpu, self.config)
+                        table = GameTable(str(msg.get("name", "Player")), cpu, msg.get("seed"))
+                        self.tables += 1
+                    elif table is None:
+                        raise ValueError("먼저 new로 게임을 시작하세요.")
+                    elif op == "keep":
+                        table.keep(msg.get("keep"))
+                    elif op == "score":
+                        table.score(msg.get("category"))
+                        await send(await table.play_cpu_turn(lambda method, *args: self.decide(agent, method, *args)))
+                        if table.finished:
+                            await send(table.final_message())
+                            table = None
+                            continue
+                        table.start_turn()
+                    else:
+                        raise ValueError(f"알 수 없는 op: {op}")
+                    await send(table.state_message())
+                except (TypeError, ValueError) as e:
+                    # 검증하지 못한 형식 오류(TypeError)도 연결을 끊지 않고 그 클라이언트에게만 알린다
+                    await send({"event": "error", "message": str(e)})
+        except (ConnectionError, asyncio.CancelledError):
+            pass  # 클라이언트가 끊었거나 서버 종료로 취소된 경우: 테이블만 닫는다
+        finally:
+            writer.close()
+
+    async def serve(self, address):
+        # 승부형(blocking=False)은 이벤트 루프에서 바로 두므로, 가치/분산 표가 없을 때 첫 결정에서
+        # 표를 만드느라(약 1분) 모든 테이블이 멈추지 않도록 접속을 받기 전에 미리 읽어 둔다
+        load_value_table()
+        load_moment_table()
+        _turn_tables()
+        server = await asyncio.start_server(self.handle, *address, limit=SERVER_MESSAGE_LIMIT)
+        print(f"🎲 게임 서버 대기 중: {address[0]}:{address[1]} (결정 워커 {self.workers}개)")
+        async with server:
+            await server.serve_forever()
+
+def run_table_server(address, workers=None, config=None):
+    server = TableServer(workers, config)
+    try:
+        asyncio.run(server.serve(address))
+    except KeyboardInterrupt:
+        print("\n🛑 게임 서버를 종료합니다.")
+    finally:
+        server.pool.shutdown(cancel_futures=True)
+
+async def _load_test_table(address, table_index, cpu, seed, bot):
+    """사람 역할은 bot(규칙형 에이전트)이 맡는다. 요청 종류별 응답 지연(ms)을 잰다."""
+    reader, writer = await asyncio.open_connection(*address)
+    latencies = {"keep": [], "score": []}
+
+    async def request(message):
+        writer.write((json.dumps(message, ensure_ascii=False) + "\n").encode('utf-8'))
+        await writer.drain()
+        start = time.perf_counter()
+        while True:
+            reply = json.loads(await reader.readline())
+            if reply["event"] in ("roll", "game_over", "error"):
+                return reply, (time.perf_counter() - start) * 1000
+
+    state, _ = await request({"op": "new", "name": f"load-{table_index}", "cpu": cpu, "seed": [seed, table_index]})
+    while state["event"] == "roll":
+        dice, scoreboard = state["dice"], state["scoreboard"]
+        keep = bot.choose_keep(dice, scoreboard, state["turn"], state["rolls_left"]) if state["rolls_left"] else range(5)
+        if len(keep) < 5:
+            op, message = "keep", {"op": "keep", "keep": list(keep)}
+        else:
+            op, message = "score", {"op": "score", "category": bot.choose_category(dice, scoreboard, state["turn"])}
+        state, ms = await request(message)
+        latencies[op].append(ms)
+    writer.close()
+    if state["event"] == "error":
+        raise RuntimeError(f"테이블 {table_index}: {state['message']}")
+    return latencies, state["scores"]
+
+def run_load_test(address, tables, cpu=CPU_TYPES[0], seed=0):
+    """tables개의 게임을 동시에 진행하고 테이블별 응답 지연을 출력한다.
+    keep 응답은 서버 자체 처리 시간, score 응답은 CPU 턴 계산까지 포함한 시간이다."""
+    bot = create_agent("일반형")
+
+    async def main():
+        return await asyncio.gather(*(_load_test_table(address, i, cpu, seed, bot) for i in range(tables)))
+
+    start = time.perf_counter()
+    results = asyncio.run(main())
+    elapsed = time.perf_counter() - start
+    rows = []
+    for i, (latencies, scores) in enumerate(results):
+        keep_ms, score_ms = np.array(latencies["keep"] or [0.0]), np.array(latencies["score"])
+        rows.append({"테이블": i, "keep 평균(ms)": keep_ms.mean(), "keep p99(ms)": np.percentile(keep_ms, 99),
+                     "CPU 턴 평균(ms)": score_ms.mean(), "CPU 턴 p99(ms)": np.percentile(score_ms, 99),
+                     "사람 점수": scores[f"load-{i}"], "CPU 점수": scores[cpu]})
+    report = pd.DataFrame(rows)
+    print(f"\n===== 부하 테스트: 테이블 {tables}개 동시 진행, CPU [{cpu}] =====")
+    print(report.to_string(index=False, float_format=lambda v: f"{v:.1f}"))
+    print(f"전체 소요 시간: {elapsed:.1f}초, keep 응답 p99(전체): "
+          f"{np.percentile(np.concatenate([r[0]['keep'] or [0.0] for r in results]), 99):.1f}ms")
+    return report
+
+# --- 상태-행동 로그 (ML 데이터 수집) ---
+def get_base_dir():
     try:
-        base_dir = os.path.dirname(sys.executable if getattr(sys, 'frozen', False) else os.path.abspath(__file__))
+        return os.path.dirname(sys.executable if getattr(sys, 'frozen', False) else os.path.abspath(__file__))
     except NameError:
-        base_dir = "."
-
-    for name, logs in player_logs.items():
-        base_filename = f"log_{name}.txt"
-        filename = os.path.join(base_dir, base_filename)
-        count = 1
-        while os.path.exists(filename):
-            filename = os.path.join(base_dir, f"log_{name}({count}).txt")
-            count += 1
-        with open(filename, "w", encoding="utf-8") as f:
-            for line in logs:
-                f.write(line + "\n")
-        print(f"📁 로그 저장 완료: {os.path.basename(filename)}")
-
-def save_progress(players, turn):
-    with open(SAVE_FILE, 'w', encoding='utf-8') as f:
-        json.dump({"turn": turn, "players": players}, f, ensure_ascii=False, indent=2)
+        return "."
+
+def new_game_id():
+    return uuid.uuid4().hex[:16]
+
+class LogStore:
+    """gzip으로 압축한 세그먼트 파일에 레코드를 스트리밍으로 덧붙이는 로그 저장소.
+    세그먼트는 압축 전 max_segment_bytes를 넘으면 교체되고, manifest.jsonl에
+    (세그먼트, 게임, 플레이어, 날짜)가 처음 나타날 때마다 한 줄씩 덧붙인다.
+    파일 이름을 찾으려고 디렉터리를 뒤지지 않으므로 추가는 O(1)이고,
+    읽는 쪽은 manifest만 보고 필요한 세그먼트를 고를 수 있다."""
+    MANIFEST = "manifest.jsonl"
+
+    def __init__(self, root, max_segment_bytes=8 << 20):
+        os.makedirs(root, exist_ok=True)
+        self.root = root
+        self.max_segment_bytes = max_segment_bytes
+        # 여러 프로세스가 같은 저장소에 써도 이름이 겹치지 않도록 세션마다 고유한 접두어를 쓴다
+        self._session = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        self._seq = 0
+        self._segment = None
+        self._f = None
+
+    def _open_segment(self):
+        self._seq += 1
+        self._segment = f"seg-{self._session}-{self._seq:04d}.jsonl.gz"
+        self._f = gzip.open(os.path.join(self.root, self._segment), 'wt', encoding='utf-8')
+        self._bytes = 0
+        self._indexed = set()
+
+    def _close_segment(self):
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+    def append(self, record):
+        if self._f is None or self._bytes >= self.max_segment_bytes:
+            self._close_segment()
+            self._open_segment()
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':')) + "\n"
+        self._f.write(line)
+        self._bytes += len(line)
+        key = (record.get("game"), record.get("player"))
+        if key not in self._indexed:
+            self._indexed.add(key)
+            date = time.strftime('%Y-%m-%d', time.localtime(record.get("ts", time.time())))
+            entry = {"segment": self._segment, "game": key[0], "player": key[1], "date": date}
+            with open(os.path.join(self.root, self.MANIFEST), 'a', encoding='utf-8') as m:
+                m.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def flush(self):
+        # gzip의 flush는 동기화 지점을 남기므로, 여기까지 쓴 내용은 프로그램이 죽어도 읽을 수 있다
+        if self._f is not None:
+            self._f.flush()
+
+    def close(self):
+        self._close_segment()
+
+    def manifest(self):
+        path = os.path.join(self.root, self.MANIFEST)
+        if not os.path.exists(path):
+            return []
+        with open(path, 'r', encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def select(self, player=None, date=None, game=None):
+        """조건에 맞는 게임들의 레코드가 담긴 세그먼트 이름을 기록 순서대로 반환"""
+        entries = self.manifest()
+        games = {e["game"] for e in entries
+                 if (player is None or e["player"] == player)
+                 and (date is None or e["date"] == date)
+                 and (game is None or e["game"] == game)}
+        segments = []
+        for e in entries:
+            if e["game"] in games and e["segment"] not in segments:
+                segments.append(e["segment"])
+        return segments
+
+    def iter_records(self, segments):
+        for name in segments:
+            try:
+                with gzip.open(os.path.join(self.root, name), 'rt', encoding='utf-8') as f:
+                    for line in f:
+                        if line.strip():
+                            yield json.loads(line)
+            except (EOFError, gzip.BadGzipFile):
+                # 비정상 종료로 끝이 잘린 세그먼트는 마지막 flush 지점까지만 읽는다
+                continue
+
+class StateActionLog:
+    """사람 플레이어의 결정 시점마다 상태-행동 레코드를 JSON Lines로 덧붙여 쓰는 기록기.
+    세션 동안 메모리에 쌓아 두지 않고 버퍼를 거쳐 바로 파일로 내보낸다.
+    레코드 종류
+    - keep : 재굴림 결정. dice, keep(위치별 0/1 마스크, 모두 1이면 굴림 중단), scoreboard
+    - score: 족보 선택. dice, scoreboard(선택 전), choice, score
+    - end  : 게임 종료. saved=False면 그 게임의 레코드는 사용하지 않는다. seed는 주사위 seed(있을 때)
+    공통 필드: game, player, turn, roll, ts(유닉스 시각), think_ms(입력까지 걸린 시간)
+    scoreboard는 CATEGORIES 순서의 12칸 리스트이며 빈 칸은 null이다.
+    진행 중인 게임의 레코드는 저장소가 아니라 게임별 임시 파일(<저장소>/staging/<게임>.jsonl)에 쌓고,
+    end_game(saved=True)일 때만 LogStore로 옮긴다. 저장하지 않으면 임시 파일을 지우므로 아무것도 남지 않는다.
+    이어 하기로 같은 게임을 다시 열면 같은 임시 파일에 이어 쓴다."""
+    STAGING_DIR = "staging"
+
+    def __init__(self, store):
+        self.store = store
+        self.game_id = None
+        self._staging_path = None
+        self._staged = None
+
+    def begin_game(self, game_id):
+        self.game_id = game_id
+        staging_dir = os.path.join(self.store.root, self.STAGING_DIR)
+        os.makedirs(staging_dir, exist_ok=True)
+        self._staging_path = os.path.join(staging_dir, f"{game_id}.jsonl")
+
+    def write(self, record):
+        if self._staged is None:
+            self._staged = open(self._staging_path, 'a', encoding='utf-8')
+        self._staged.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + "\n")
+
+    def write_decision(self, kind, player_name, turn, roll, dice, scoreboard, keep_idxs=None, **extra):
+        record = {"type": kind, "game": self.game_id, "player": player_name, "turn": turn, "roll": roll,
+                  "dice": list(dice), "scoreboard": [scoreboard.get(c) for c in CATEGORIES],
+                  "ts": round(time.time(), 3)}
+        if keep_idxs is not None:
+            keep_idxs = set(keep_idxs)
+            record["keep"] = [1 if i in keep_idxs else 0 for i in range(5)]
+        record.update(extra)
+        self.write(record)
+
+    def _close_staged(self):
+        if self._staged is not None:
+            self._staged.close()
+            self._staged = None
+
+    def end_game(self, saved, seed=None):
+        """saved면 쌓아 둔 레코드와 종료 레코드를 저장소로 옮기고, 어느 쪽이든 임시 파일을 지운다"""
+        self._close_staged()
+        if saved:
+            if os.path.exists(self._staging_path):
+                with open(self._staging_path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            self.store.append(json.loads(line))
+                        except json.JSONDecodeError:
+                            break  # 비정상 종료로 끝이 잘린 마지막 줄
+            record = {"type": "end", "game": self.game_id, "saved": True, "ts": round(time.time(), 3)}
+            if seed is not None:
+                record["seed"] = seed
+            self.store.append(record)
+            self.store.flush()
+        if os.path.exists(self._staging_path):
+            os.remove(self._staging_path)
+
+    def flush(self):
+        if self._staged is not None:
+            self._staged.flush()
+
+    def close(self):
+        self._close_staged()
+        self.store.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def iter_saved_games(store, player=None, date=None, game=None):
+    """manifest로 고른 세그먼트만 스트리밍으로 읽어, 저장하기로 한 게임의 레코드 목록을 게임 단위로 돌려준다"""
+    open_games = {}
+    for record in store.iter_records(store.select(player, date, game)):
+        if game is not None and record["game"] != game:
+            continue
+        if record["type"] == "end":
+            game_records = open_games.pop(record["game"], [])
+            if record["saved"] and game_records:
+                yield game_records
+        else:
+            open_games.setdefault(record["game"], []).append(record)
+
+# --- 학습 데이터셋 빌더 ---
+# 결정 시점 하나가 한 행이다. 모든 특징은 0~255 범위라 uint8로 저장한다.
+FEATURE_NAMES = ([f"die_{i}" for i in range(1, 6)] + [f"count_{face}" for face in range(1, 7)]
+                 + ["rolls_left", "upper_score", "turn", "is_category_decision"]
+                 + [f"open_{cat}" for cat in CATEGORIES])
+NO_LABEL = 255
+
+def featurize_decision(record):
+    """상태-행동 레코드 하나를 (특징 리스트, 고정 마스크 라벨, 족보 라벨)로 변환.
+    고정 마스크는 주사위 위치 기준 5비트, 해당하지 않는 라벨은 NO_LABEL."""
+    dice = record["dice"]
+    board = record["scoreboard"]
+    counts = [0] * 6
+    for d in dice:
+        counts[d - 1] += 1
+    upper = sum(v for v in board[:6] if v is not None)
+    is_category = record["type"] == "score"
+    features = (list(dice) + counts + [3 - record["roll"], min(upper, 255), record["turn"], int(is_category)]
+                + [1 if v is None else 0 for v in board])
+    if is_category:
+        return features, NO_LABEL, CATEGORIES.index(record["choice"])
+    keep_mask = sum(bit << i for i, bit in enumerate(record["keep"]))
+    return features, keep_mask, NO_LABEL
+
+def _scan_saved_game_ids(args):
+    root, segment = args
+    saved, discarded = set(), set()
+    for record in LogStore(root).iter_records([segment]):
+        if record["type"] == "end":
+            (saved if record["saved"] else discarded).add(record["game"])
+    return saved, discarded
+
+def _featurize_segment(args):
+    """세그먼트 하나를 스트리밍으로 읽어 shard_rows 행마다 샤드 파일로 내보낸다 (메모리 상한 고정)"""
+    root, segment, seg_index, saved_games, out_dir, shard_rows = args
+    features = np.empty((shard_rows, len(FEATURE_NAMES)), dtype=np.uint8)
+    keep = np.empty(shard_rows, dtype=np.uint8)
+    category = np.empty(shard_rows, dtype=np.uint8)
+    shards, row = [], 0
+
+    def write_shard():
+        name = f"{seg_index:05d}-{len(shards):03d}"
+        np.save(os.path.join(out_dir, f"X-{name}.npy"), features[:row])
+        np.save(os.path.join(out_dir, f"keep-{name}.npy"), keep[:row])
+        np.save(os.path.join(out_dir, f"category-{name}.npy"), category[:row])
+        shards.append({"name": name, "rows": row})
+
+    for record in LogStore(root).iter_records([segment]):
+        if record["type"] == "end" or record["game"] not in saved_games:
+            continue
+        if record.get("unknown_categories"):
+            continue  # 이어 한 레거시 로그: 열린 족보/상단 점수 특징을 알 수 없다
+        features[row], keep[row], category[row] = featurize_decision(record)
+        row += 1
+        if row == shard_rows:
+            write_shard()
+            row = 0
+    if row:
+        write_shard()
+    return shards
+
+def build_dataset(log_dir, out_dir, workers=None, shard_rows=1 << 20):
+    """로그 저장소의 저장된 게임들을 결정 단위 학습 데이터(샤드별 .npy)로 변환한다.
+    1단계에서 세그먼트들의 종료 레코드만 모아 저장된 게임을 정하고,
+    2단계에서 세그먼트별로 병렬 변환한다. 결과는 load_dataset으로 메모리 맵해 읽는다."""
+    store = LogStore(log_dir)
+    segments = store.select()
+    os.makedirs(out_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    with multiprocessing.Pool(workers) as pool:
+        saved_games, discarded = set(), set()
+        for saved, dropped in pool.imap(_scan_saved_game_ids, [(log_dir, seg) for seg in segments]):
+            saved_games |= saved
+            discarded |= dropped
+        saved_games -= discarded
+        tasks = [(log_dir, seg, i, saved_games, out_dir, shard_rows) for i, seg in enumerate(segments)]
+        shards = [shard for seg_shards in pool.imap(_featurize_segment, tasks) for shard in seg_shards]
+    rows = sum(sh["rows"] for sh in shards)
+    with open(os.path.join(out_dir, "meta.json"), 'w', encoding='utf-8') as f:
+        json.dump({"features": FEATURE_NAMES, "categories": CATEGORIES, "no_label": NO_LABEL,
+                   "games": len(saved_games), "rows": rows, "shards": shards}, f, ensure_ascii=False)
+    elapsed = time.perf_counter() - start
+    print(f"🧮 데이터셋 생성 완료: 게임 {len(saved_games)}개, 결정 {rows}개, 샤드 {len(shards)}개 "
+          f"({elapsed:.1f}초, {rows / max(elapsed, 1e-9):.0f} 결정/초)")
+    return rows
+
+def load_dataset(out_dir):
+    """build_dataset 결과를 샤드별 (X, keep, category) 메모리 맵 배열로 돌려준다"""
+    with open(os.path.join(out_dir, "meta.json"), 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    for shard in meta["shards"]:
+        yield tuple(np.load(os.path.join(out_dir, f"{col}-{shard['name']}.npy"), mmap_mode='r')
+                    for col in ("X", "keep", "category"))
+
+# --- 레거시 .txt 로그 변환 ---
+# v2.5까지의 save_all_logs가 남긴 log_<이름>.txt 한 파일은 한 게임, 한 플레이어의 기록이다.
+LEGACY_LOG_GRAMMAR = re.compile(
+    r"^(?:\[(?P<turn>\d+)턴\]"
+    r"|🎲 (?P<roll>[1-3])차 굴림: \[(?P<dice>[1-6](?:, [1-6]){4})\]"
+    r"|(?P<reroll_at>[1-3])차 굴림 - 재굴림: \[(?P<reroll>(?:[1-5](?:, [1-5])*)?)\]"
+    r"|(?P<stop_at>[1-3])차 굴림 (?P<stop>종료 \(엔터 입력\)|전 중단)"
+    r"|최종 선택: (?P<choice>.+) \((?P<score>\d+)점\))$")
+LEGACY_LOG_NAME = re.compile(r"^log_(?P<name>.+?)(?:\(\d+\))?\.txt$")
+
+class LegacyLogError(ValueError):
+    pass
+
+def parse_legacy_log(path):
+    """레거시 로그 한 파일을 검증하며 상태-행동 레코드 리스트로 변환한다. (레코드, lossy_turns)를 반환"""
+    match = LEGACY_LOG_NAME.match(os.path.basename(path))
+    if not match:
+        raise LegacyLogError("파일 이름이 log_<이름>.txt 형식이 아닙니다")
+    game_id = "legacy-" + hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()[:12]
+    with open(path, 'r', encoding='utf-8') as f:
+        return parse_legacy_lines(f, match["name"], game_id, round(os.path.getmtime(path), 3))
+
+def parse_legacy_lines(lines, player, game_id, ts):
+    """레거시 로그 줄들을 검증하며 상태-행동 레코드 리스트로 변환한다.
+    굴림 사이에 재굴림하지 않은 주사위가 바뀌었거나, 점수가 주사위와 맞지 않거나,
+    이미 쓴 족보를 다시 고르면 LegacyLogError를 낸다.
+    '0. 다시 굴리기' 경로의 재굴림은 결과 주사위가 기록되지 않았으므로,
+    그 이후의 결정은 레코드로 만들지 않고 lossy_turns로 센다.
+    이어 하기로 N턴(N>1)부터 시작하는 로그는 그 전에 쓴 족보를 알 수 없으므로, 레코드에
+    unknown_categories(모르는 족보 수)를 붙이고 중복 검사는 로그에 나온 족보끼리만 한다.
+    예전 게임은 굴림 번호(roll_number)를 '다시 굴리기' 경로에서 재굴림하지 않고 멈춰도 올렸으므로,
+    그 커서(cursor)를 따로 따라가며 위치를 검사한다. roll은 지금 주사위가 나온 굴림이다."""
+    scoreboard = {c: None for c in CATEGORIES}
+    records, lossy_turns = [], 0
+    turn = unknown = cursor = 0
+    dice = roll = pending_reroll = None
+    main_loop = False  # 본 굴림 루프(재굴림 → 다음 굴림 기록) 안인지, 족보 메뉴의 '다시 굴리기' 경로인지
+
+    def base(kind, at_roll):
+        record = {"type": kind, "game": game_id, "player": player, "turn": turn, "roll": at_roll,
+                  "dice": list(dice), "scoreboard": [scoreboard[c] for c in CATEGORIES], "ts": ts, "source": "legacy"}
+        if unknown:
+            record["unknown_categories"] = unknown
+        return record
+
+    for lineno, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        m = LEGACY_LOG_GRAMMAR.match(line)
+        if m is None:
+            raise LegacyLogError(f"{lineno}행: 알 수 없는 형식 {line!r}")
+        if m["turn"]:
+            next_turn = int(m["turn"])
+            if turn == 0 and 1 < next_turn <= len(CATEGORIES):
+                # 저장했다가 이어 한 게임의 로그: 앞선 턴에 쓴 족보와 점수는 알 수 없다
+                unknown = next_turn - 1
+            elif next_turn != turn + 1 or next_turn > len(CATEGORIES):
+                raise LegacyLogError(f"{lineno}행: 턴 번호가 연속되지 않습니다 ({turn} → {m['turn']})")
+            if roll is not None:
+                raise LegacyLogError(f"{lineno}행: {turn}턴에 최종 선택이 없습니다")
+            turn, dice, roll, cursor, pending_reroll, main_loop = next_turn, None, 0, 0, None, True
+        elif turn == 0 or roll is None:
+            raise LegacyLogError(f"{lineno}행: 턴 머리글 밖의 기록입니다")
+        elif m["roll"]:
+            new_dice = [int(d) for d in m["dice"].split(", ")]
+            if not main_loop or int(m["roll"]) != cursor + 1:
+                raise LegacyLogError(f"{lineno}행: 굴림 순서가 맞지 않습니다")
+            if cursor > 0:
+                if pending_reroll is None or dice is None:
+                    raise LegacyLogError(f"{lineno}행: 재굴림 기록 없이 다음 굴림이 나왔습니다")
+                changed = [i for i in range(5) if new_dice[i] != dice[i] and i not in pending_reroll]
+                if changed:
+                    raise LegacyLogError(f"{lineno}행: 재굴림하지 않은 주사위 {[i + 1 for i in changed]}번이 바뀌었습니다")
+            dice, roll, cursor, pending_reroll = new_dice, int(m["roll"]), int(m["roll"]), None
+            main_loop = cursor < 3  # 3차 굴림 뒤에는 바로 족보 메뉴로 간다
+        elif m["reroll_at"]:
+            at = int(m["reroll_at"])
+            indices = {int(i) - 1 for i in m["reroll"].split(", ")} if m["reroll"] else set()
+            if main_loop and at == cursor and pending_reroll is None:
+                records.append({**base("keep", roll), "keep": [0 if i in indices else 1 for i in range(5)]})
+                pending_reroll = indices
+            elif not main_loop and at == cursor + 1:
+                # '다시 굴리기' 경로: 화면의 주사위(roll차 결과)를 보고 at차로 재굴림했지만 결과는 기록되지 않는다
+                if dice is not None:
+                    records.append({**base("keep", roll), "keep": [0 if i in indices else 1 for i in range(5)]})
+                dice, roll, cursor = None, at, at
+            else:
+                raise LegacyLogError(f"{lineno}행: 재굴림 위치가 맞지 않습니다")
+        elif m["stop_at"]:
+            at = int(m["stop_at"])
+            if m["stop"].startswith("종료"):
+                valid = main_loop and at == cursor and pending_reroll is None
+            else:
+                valid = not main_loop and at == cursor + 1  # 'N차 굴림 전 중단'도 예전 게임의 커서를 N으로 옮긴다
+            if not valid:
+                raise LegacyLogError(f"{lineno}행: 굴림 중단 위치가 맞지 않습니다")
+            if dice is not None:
+                records.append({**base("keep", roll), "keep": [1] * 5})
+            cursor, main_loop = at, False
+        else:
+            choice, score = m["choice"], int(m["score"])
+            if choice not in CATEGORIES:
+                raise LegacyLogError(f"{lineno}행: 알 수 없는 족보 {choice!r}")
+            if scoreboard[choice] is not None:
+                raise LegacyLogError(f"{lineno}행: 이미 기록한 족보 {choice}를 다시 골랐습니다")
+            if dice is None:
+                lossy_turns += 1
+            else:
+                if score_category(dice, choice) != score:
+                    raise LegacyLogError(f"{lineno}행: {choice} 점수 {score}점이 주사위 {dice}와 맞지 않습니다")
+                records.append({**base("score", roll), "choice": choice, "score": score})
+            scoreboard[choice] = score
+            roll = None
+    if turn == 0:
+        raise LegacyLogError("기록된 턴이 없습니다")
+    if roll is not None:
+        raise LegacyLogError(f"{turn}턴이 최종 선택 없이 끝났습니다")
+    records.append({"type": "end", "game": game_id, "saved": True, "ts": ts})
+    return records, lossy_turns
+
+# 예전 게임이 실제로 남기는 줄 순서들. verify_legacy_parser가 파서가 이 판정을 그대로 내리는지 확인한다.
+LEGACY_LOG_CASES = [
+    ("본 굴림 루프만 쓴 턴", None, [
+        "[1턴]", "🎲 1차 굴림: [1, 1, 2, 3, 5]", "1차 굴림 - 재굴림: [3, 4, 5]",
+        "🎲 2차 굴림: [1, 1, 1, 6, 6]", "2차 굴림 종료 (엔터 입력)", "최종 선택: Full House (25점)"]),
+    ("3차 굴림 뒤 바로 선택", None, [
+        "[1턴]", "🎲 1차 굴림: [2, 2, 3, 4, 6]", "1차 굴림 - 재굴림: [5]", "🎲 2차 굴림: [2, 2, 3, 4, 6]",
+        "2차 굴림 - 재굴림: [1, 2, 5]", "🎲 3차 굴림: [1, 5, 3, 4, 6]", "최종 선택: Chance (19점)"]),
+    ("다시 굴리기에서 멈춘 뒤 다시 굴리기", None, [
+        "[1턴]", "🎲 1차 굴림: [1, 2, 3, 4, 6]", "1차 굴림 종료 (엔터 입력)", "2차 굴림 전 중단",
+        "3차 굴림 - 재굴림: [5]", "최종 선택: Chance (15점)"]),
+    ("이어 하기로 11턴부터 시작", None, [
+        "[11턴]", "🎲 1차 굴림: [3, 3, 3, 3, 3]", "1차 굴림 종료 (엔터 입력)", "최종 선택: Yahtzee (50점)",
+        "[12턴]", "🎲 1차 굴림: [1, 2, 3, 4, 5]", "1차 굴림 종료 (엔터 입력)", "최종 선택: Large Straight (30점)"]),
+    ("다시 굴리기에서 같은 굴림 번호를 또 씀", "재굴림 위치", [
+        "[1턴]", "🎲 1차 굴림: [1, 2, 3, 4, 6]", "1차 굴림 종료 (엔터 입력)", "2차 굴림 전 중단",
+        "2차 굴림 - 재굴림: [5]", "최종 선택: Chance (15점)"]),
+    ("재굴림하지 않은 주사위가 바뀜", "재굴림하지 않은 주사위", [
+        "[1턴]", "🎲 1차 굴림: [1, 2, 3, 4, 6]", "1차 굴림 - 재굴림: [5]",
+        "🎲 2차 굴림: [2, 2, 3, 4, 1]", "2차 굴림 종료 (엔터 입력)", "최종 선택: Chance (12점)"]),
+]
+
+def verify_legacy_parser():
+    """LEGACY_LOG_CASES의 줄 순서마다 파서의 판정(통과 또는 기대한 오류)을 확인한다. 실패 목록을 반환"""
+    failures = []
+    for name, expected_error, lines in LEGACY_LOG_CASES:
+        try:
+            parse_legacy_lines(lines, "check", "legacy-check", 0.0)
+            error = None
+        except LegacyLogError as e:
+            error = str(e)
+        if (error is None) != (expected_error is None) or error is not None and expected_error not in error:
+            failures.append((name, error or "통과"))
+    return failures
+
+def _parse_legacy_task(path):
+    try:
+        records, lossy_turns = parse_legacy_log(path)
+        return path, records, lossy_turns, None
+    except (LegacyLogError, OSError, UnicodeDecodeError) as e:
+        return path, None, 0, str(e)
+
+def ingest_legacy_logs(paths, log_dir=LOG_STORE_DIR, workers=None):
+    """레거시 log_*.txt 파일(또는 그런 파일이 든 폴더)을 모든 코어에서 병렬로 파싱·검증하고,
+    통과한 게임을 로그 저장소에 구조화된 레코드로 옮긴다. 반환값은 (성공, 실패) 게임 수."""
+    files = []
+    for p in paths:
+        files.extend(sorted(glob.glob(os.path.join(p, "log_*.txt"))) if os.path.isdir(p) else [p])
+    store = LogStore(log_dir)
+    ok = failed = lossy = records_written = 0
+    start = time.perf_counter()
+    with multiprocessing.Pool(workers or os.cpu_count() or 1) as pool:
+        for path, records, lossy_turns, error in pool.imap_unordered(_parse_legacy_task, files, chunksize=16):
+            if error is not None:
+                failed += 1
+                print(f"⚠️ {os.path.basename(path)}: {error}")
+                continue
+            for record in records:
+                store.append(record)
+            ok += 1
+            lossy += lossy_turns
+            records_written += len(records)
+    store.close()
+    elapsed = time.perf_counter() - start
+    print(f"📥 레거시 로그 변환 완료: 파일 {len(files)}개 (성공 {ok}, 실패 {failed}), 레코드 {records_written}개, "
+          f"주사위가 기록되지 않은 턴 {lossy}개 | {elapsed:.1f}초, {len(files) / max(elapsed, 1e-9):.0f} 파일/초")
+    return ok, failed
+
+# --- 엘리트형 자기 대전 데이터 생성 ---
+def play_labeled_elite_game(dice_source):
+    """엘리트형 CPU로 한 게임을 두며 모든 결정 시점을 (레코드, 후보별 EV 32칸)으로 남긴다.
+    EV 배열은 위치 기준 고정 마스크(0~31)로 인덱싱하며, 평가하지 않은 후보는 NaN이다."""
+    ai_ds = dice_source.spawn()
+    scoreboard = {c: None for c in CATEGORIES}
+    decisions = []
+    for turn in range(1, 13):
+        dice = dice_source.roll(5)
+        roll = 1
+        for rolls_left in (2, 1):
+            board = [scoreboard[c] for c in CATEGORIES]
+            ev = np.full(32, np.nan, dtype=np.float32)
+            keep = two_pair_keep_elite(dice, scoreboard)
+            if keep is None:
+                best_ev = -1
+                for keep_idxs, value in evaluate_keeps_elite(dice, scoreboard, turn, rolls_left, dice_source=ai_ds):
+                    ev[sum(1 << i for i in keep_idxs)] = value
+                    if value > best_ev:
+                        best_ev, keep = value, keep_idxs
+            keep_mask = [1 if i in keep else 0 for i in range(5)]
+            decisions.append(({"type": "keep", "turn": turn, "roll": roll, "dice": list(dice),
+                               "scoreboard": board, "keep": keep_mask}, ev))
+            if len(keep) == 5:
+                break
+            new_dice = [d for i, d in enumerate(dice) if i in keep]
+            new_dice.extend(dice_source.roll(5 - len(new_dice)))
+            dice = new_dice
+            roll += 1
+        choice = cpu_select_category_elite(dice, scoreboard, turn)
+        decisions.append(({"type": "score", "turn": turn, "roll": roll, "dice": list(dice),
+                           "scoreboard": [scoreboard[c] for c in CATEGORIES], "choice": choice},
+                          np.full(32, np.nan, dtype=np.float32)))
+        scoreboard[choice] = score_category(dice, choice)
+    return decisions
+
+def generate_selfplay_shard(out_dir, shard_id, seed, games):
+    """샤드 하나를 생성한다. 게임 g의 주사위는 (seed, shard_id, g)로만 정해지므로
+    같은 샤드 번호를 다시 돌리면 바이트 단위로 같은 파일이 나온다."""
+    X, keep, category, ev = [], [], [], []
+    for g in range(games):
+        for record, values in play_labeled_elite_game(DiceSource([seed, shard_id, g])):
+            features, keep_label, category_label = featurize_decision(record)
+            X.append(features)
+            keep.append(keep_label)
+            category.append(category_label)
+            ev.append(values)
+    shard_dir = os.path.join(out_dir, f"shard-{shard_id:05d}")
+    os.makedirs(shard_dir, exist_ok=True)
+    np.save(os.path.join(shard_dir, "X.npy"), np.array(X, dtype=np.uint8))
+    np.save(os.path.join(shard_dir, "keep.npy"), np.array(keep, dtype=np.uint8))
+    np.save(os.path.join(shard_dir, "category.npy"), np.array(category, dtype=np.uint8))
+    np.save(os.path.join(shard_dir, "ev.npy"), np.array(ev, dtype=np.float32))
+    return shard_id, len(X)
+
+def _selfplay_shard_task(args):
+    return generate_selfplay_shard(*args)
+
+def generate_selfplay_dataset(out_dir, num_shards, games_per_shard, seed=0, first_shard=0, workers=None):
+    """엘리트형 CPU의 자기 대전으로 라벨이 붙은 결정 데이터를 샤드 단위로 병렬 생성한다.
+    특징/라벨 형식은 build_dataset과 같고, 샤드마다 후보별 EV(ev.npy)가 추가된다."""
+    os.makedirs(out_dir, exist_ok=True)
+    with open(os.path.join(out_dir, "meta.json"), 'w', encoding='utf-8') as f:
+        json.dump({"features": FEATURE_NAMES, "categories": CATEGORIES, "no_label": NO_LABEL,
+                   "seed": seed, "games_per_shard": games_per_shard}, f, ensure_ascii=False)
+    tasks = [(out_dir, shard_id, seed, games_per_shard) for shard_id in range(first_shard, first_shard + num_shards)]
+    decisions = 0
+    start = time.perf_counter()
+    with multiprocessing.Pool(workers or os.cpu_count() or 1, initializer=_ignore_sigint) as pool:
+        for shard_id, rows in pool.imap_unordered(_selfplay_shard_task, tasks):
+            decisions += rows
+            elapsed = time.perf_counter() - start
+            print(f"  샤드 {shard_id:05d}: 결정 {rows}개 | 누적 {decisions}개, {decisions / elapsed:.1f} 결정/초")
+    print(f"🤖 자기 대전 데이터 생성 완료: 샤드 {num_shards}개, 결정 {decisions}개 ({time.perf_counter() - start:.1f}초)")
+    return decisions
+
+# --- 게임 저장 (스냅샷 + 이동 저널) ---
+class GameJournal:
+    """게임 진행 상황을 '스냅샷 + 추가 전용 저널'로 저장한다.
+    이동(굴림 결과, 족보 기록)마다 저널에 한 줄을 덧붙이고 fsync하며,
+    라운드가 끝날 때 스냅샷을 원자적으로 교체한 뒤 저널을 비운다(compaction).
+    복구는 스냅샷을 읽고 저널을 순서대로 다시 적용하는 방식이다."""
+
+    def __init__(self, snapshot_path=SAVE_FILE, journal_path=JOURNAL_FILE):
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path
+        self._f = None
+
+    def compact(self, players, config):
+        atomic_write_json(self.snapshot_path, {"version": 2, "players": players, "config": config})
+        if self._f is not None:
+            self._f.close()
+        self._f = open(self.journal_path, 'w', encoding='utf-8')
+        self._f.flush()
+        os.fsync(self._f.fileno())
+
+    def append(self, event):
+        self._f.write(json.dumps(event, ensure_ascii=False, separators=(',', ':')) + "\n")
+        self._f.flush()
+        os.fsync(self._f.fileno())
+
+    def discard(self):
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+        for path in (self.snapshot_path, self.journal_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def load(self):
+        """(players, config, pending)을 반환. pending은 턴 도중 마지막 굴림 상태(없으면 None)"""
+        with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        players = data["players"]
+        config = {**DEFAULT_GAME_CONFIG, **data.get("config", {})}
+        pending = None
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        event = json.loads(line)
+                    except json.JSONDecodeError:
+                        break  # 기록 도중 끊긴 마지막 줄
+                    if event["type"] == "roll":
+                        pending = event
+                    elif event["type"] == "score":
+                        scoreboard = players[event["player"]]["scoreboard"]
+                        if scoreboard.get(event["choice"]) is None:
+                            scoreboard[event["choice"]] = event["score"]
+                        pending = None
+        return players, config, pending
+
+def next_turn_of(player):
+    return sum(1 for v in player['scoreboard'].values() if v is not None) + 1
 
 def load_progress():
     if os.path.exists(SAVE_FILE):
         try:
-            with open(SAVE_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            return data["players"], data["turn"]
-        except (json.JSONDecodeError, KeyError):
+            return GameJournal().load()
+        except (json.JSONDecodeError, KeyError, TypeError, IndexError):
             print("⚠️ 저장 파일이 손상되었습니다. 새 게임을 시작합니다.")
-            return None, None
-    return None, None
+            return None, None, None
+    return None, None, None
+
+# --- 명령행 도구 ---
+def run_cli(argv):
+    parser = argparse.ArgumentParser(prog="yahtzee_ai.py")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_worker = sub.add_parser("worker", help="코디네이터에 접속해 시뮬레이션 배치를 처리")
+    p_worker.add_argument("--connect", required=True, help="host:port")
+    p_worker.add_argument("--authkey", required=True, help="코디네이터가 출력한 접속 키")
+
+    p_analyze = sub.add_parser("analyze", help="CPU 성능 분석 (체크포인트/재개 지원)")
+    p_analyze.add_argument("--cpu", default=CPU_TYPES[0],
+                           help="CPU 유형 이름 또는 번호(1-6), 또는 예전 버전 에이전트 (예: v2.5/엘리트형)")
+    p_analyze.add_argument("--games", type=int, default=100)
+    p_analyze.add_argument("--seed", type=int, default=None)
+    p_analyze.add_argument("--trace-dir", default=None)
+    p_analyze.add_argument("--checkpoint", default=ANALYSIS_CHECKPOINT_FILE)
+    p_analyze.add_argument("--checkpoint-interval", type=float, default=30.0, help="초")
+    p_analyze.add_argument("--resume", action="store_true")
+    p_analyze.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    p_analyze.add_argument("--elite-category", choices=ELITE_CATEGORY_MODES, default="rule",
+                           help="엘리트형 족보 선택 방식 (value: 상태 가치 표 사용)")
+    p_analyze.add_argument("--profile", help="튜너가 저장한 프로필 JSON (분석할 CPU 유형의 프로필만 적용)")
+    p_analyze.add_argument("--policy-cache", help="엘리트형 결정 캐시(sqlite) 경로. 지정하면 캐시를 채우고 재사용한다")
+
+    p_dataset = sub.add_parser("dataset", help="로그 저장소를 학습용 샤드(.npy)로 변환")
+    p_dataset.add_argument("--logs", default=LOG_STORE_DIR)
+    p_dataset.add_argument("--out", required=True)
+    p_dataset.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    p_dataset.add_argument("--shard-rows", type=int, default=1 << 20)
+
+    p_ingest = sub.add_parser("ingest-legacy", help="예전 log_*.txt 로그를 검증 후 로그 저장소로 변환")
+    p_ingest.add_argument("paths", nargs="+", help="log_*.txt 파일 또는 폴더")
+    p_ingest.add_argument("--logs", default=LOG_STORE_DIR)
+    p_ingest.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+
+    p_selfplay = sub.add_parser("selfplay", help="엘리트형 CPU 자기 대전으로 라벨 데이터 샤드 생성")
+    p_selfplay.add_argument("--out", required=True)
+    p_selfplay.add_argument("--shards", type=int, default=1)
+    p_selfplay.add_argument("--first-shard", type=int, default=0)
+    p_selfplay.add_argument("--games-per-shard", type=int, default=10)
+    p_selfplay.add_argument("--seed", type=int, default=0)
+    p_selfplay.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+
+    p_record = sub.add_parser("record-games", help="시뮬레이션 게임을 압축 게임 기록으로 저장")
+    p_record.add_argument("--cpu", default=CPU_TYPES[1], help="CPU 유형 이름 또는 번호(1-6)")
+    p_record.add_argument("--games", type=int, default=1000)
+    p_record.add_argument("--seed", type=int, default=0)
+    p_record.add_argument("--out", required=True)
+
+    p_replay = sub.add_parser("replay-verify", help="압축 게임 기록을 재생하며 검증")
+    p_replay.add_argument("path")
+    p_replay.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+
+    p_tune = sub.add_parser("tune", help="엘리트형/도박형 프로필 상수를 진화 전략으로 튜닝")
+    p_tune.add_argument("--cpu", default=CPU_TYPES[1], help="CPU 유형 이름 또는 번호(1-6)")
+    p_tune.add_argument("--generations", type=int, default=20)
+    p_tune.add_argument("--population", type=int, default=12)
+    p_tune.add_argument("--games", type=int, default=200, help="후보당 평가 게임 수")
+    p_tune.add_argument("--seed", type=int, default=0)
+    p_tune.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    p_tune.add_argument("--elite-n-sim", type=int, default=100, help="엘리트형 평가 시 몬테카를로 횟수")
+    p_tune.add_argument("--checkpoint", default=TUNER_CHECKPOINT_FILE)
+    p_tune.add_argument("--resume", action="store_true")
+    p_tune.add_argument("--out", default=PROFILE_FILE)
+
+    p_dist = sub.add_parser("distribution", help="점수판 상태에서 최적 정책의 정확한 최종 점수 분포")
+    p_dist.add_argument("--board", default="", help="예: \"Ones=3,Sixes=24,Chance=22\" (비우면 새 게임)")
+
+    sub.add_parser("verify-legacy", help="예전 게임이 남기는 로그 줄 순서들로 레거시 로그 파서의 판정을 확인")
+
+    p_rules = sub.add_parser("verify-rules", help="규칙형 CPU 결정 표가 원래 규칙 함수와 같은 수를 두는지 전수 비교")
+    p_rules.add_argument("--states", type=int, default=300, help="CPU 유형당 무작위 점수판 상태 수")
+    p_rules.add_argument("--seed", type=int, default=0)
+
+    p_report = sub.add_parser("report", help="모든 버전 에이전트의 점수와 결정 지연/처리량을 같은 seed로 비교")
+    p_report.add_argument("--agents", default="", help="쉼표로 구분한 에이전트 이름 (비우면 전부)")
+    p_report.add_argument("--games", type=int, default=20, help="에이전트당 최대 게임 수")
+    p_report.add_argument("--seed", type=int, default=0)
+    p_report.add_argument("--time-budget", type=float, default=60.0, help="에이전트당 최대 측정 시간(초)")
+    p_report.add_argument("--csv", default=None, help="결과를 CSV로 저장할 경로")
+
+    p_serve = sub.add_parser("serve", help="여러 게임 테이블을 동시에 여는 asyncio TCP 게임 서버")
+    p_serve.add_argument("--listen", default=DEFAULT_SERVER_ADDRESS, help="host:port")
+    p_serve.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="CPU 결정용 프로세스 수")
+
+    p_load = sub.add_parser("loadtest", help="게임 서버에 동시 테이블을 열어 응답 지연을 측정")
+    p_load.add_argument("--connect", default=DEFAULT_SERVER_ADDRESS, help="host:port")
+    p_load.add_argument("--tables", type=int, default=8)
+    p_load.add_argument("--cpu", default=CPU_TYPES[0], help="CPU 유형 이름 또는 번호(1-6)")
+    p_load.add_argument("--seed", type=int, default=0)
+
+    p_spec = sub.add_parser("speculate-bench", help="사람 입력 중 추측 계산이 엘리트형 CPU 턴 지연을 얼마나 줄이는지 측정")
+    p_spec.add_argument("--turns", type=int, default=6)
+    p_spec.add_argument("--think", type=float, default=5.0, help="턴마다 흉내 낼 사람의 고민 시간(초)")
+    p_spec.add_argument("--seed", type=int, default=0)
+
+    p_league = sub.add_parser("league", help="CPU 유형끼리 라운드 로빈 다인전 리그 (Elo, 상대별 승률)")
+    p_league.add_argument("--agents", default="", help="쉼표로 구분한 에이전트 이름 (비우면 현재 CPU 유형 전부)")
+    p_league.add_argument("--rounds", type=int, default=100, help="조합마다 둘 seed 수 (seed마다 자리 순환)")
+    p_league.add_argument("--players", type=int, default=2, help="한 대국 인원")
+    p_league.add_argument("--seed", type=int, default=0)
+    p_league.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    p_league.add_argument("--elite-n-sim", type=int, default=100, help="엘리트형 몬테카를로 횟수")
+    p_league.add_argument("--csv", default=None, help="순위표를 CSV로 저장할 경로")
+
+    p_coord = sub.add_parser("coordinator", help="여러 워커에 시뮬레이션 배치를 분배")
+    p_coord.add_argument("--listen", default="127.0.0.1:5055",
+                         help="host:port (다른 머신의 워커를 받으려면 0.0.0.0:5055 등)")
+    p_coord.add_argument("--authkey", default=None, help="워커 접속 키 (비우면 무작위로 만들어 출력)")
+    p_coord.add_argument("--cpu", default=CPU_TYPES[0], help="CPU 유형 이름 또는 번호(1-6)")
+    p_coord.add_argument("--games", type=int, default=1000)
+    p_coord.add_argument("--seed", type=int, default=0)
+    p_coord.add_argument("--batch-size", type=int, default=20)
+    p_coord.add_argument("--batch-timeout", type=float, default=3600.0)
+    p_coord.add_argument("--local-workers", type=int, default=0, help="같은 머신에서 띄울 워커 수")
+
+    args = parser.parse_args(argv)
+    cpu_type = None
+    if hasattr(args, "cpu"):
+        cpu_type = CPU_TYPES[int(args.cpu) - 1] if args.cpu.isdigit() else args.cpu
+        if cpu_type not in CPU_TYPES and cpu_type not in agent_names():
+            parser.error(f"알 수 없는 CPU 유형: {args.cpu} (가능한 이름: {', '.join(agent_names())})")
+
+    if args.command == "worker":
+        run_worker(parse_address(args.connect), args.authkey.encode())
+    elif args.command == "analyze":
+        analyze_cpu_performance(cpu_type, args.games, args.trace_dir, args.seed, args.checkpoint,
+                                args.resume, checkpoint_interval=args.checkpoint_interval, workers=args.workers,
+                                config=dict(ANALYSIS_GAME_CONFIG, elite_category=args.elite_category,
+                                            profiles=load_profiles(args.profile) if args.profile else None,
+                                            policy_cache=args.policy_cache))
+    elif args.command == "coordinator":
+        coordinator = SimulationCoordinator(cpu_type, args.games, args.seed, args.batch_size, args.batch_timeout)
+        authkey = args.authkey
+        if authkey is None:
+            authkey = secrets.token_hex(16)
+            print(f"🔑 워커 접속 키: {authkey}  (워커에서 --authkey {authkey})")
+        start = time.perf_counter()
+        stats = coordinator.run(parse_address(args.listen), authkey.encode(), args.local_workers)
+        print(f"\n===== CPU 유형: [{cpu_type}] 분산 성능 분석 (seed={args.seed}) =====")
+        print(f"시뮬레이션 횟수: {stats.count}회, 소요 시간: {time.perf_counter() - start:.1f}초, "
+              f"재할당된 배치: {coordinator.reassigned}개")
+        print_score_statistics(stats)
+    elif args.command == "tune":
+        if cpu_type not in TUNABLE_CPU_TYPES:
+            parser.error("프로필 튜닝은 엘리트형/도박형만 지원합니다")
+        tune_profile(cpu_type, args.generations, args.population, args.games, args.seed, args.workers,
+                     args.checkpoint, args.resume, args.out, args.elite_n_sim)
+    elif args.command == "distribution":
+        try:
+            scoreboard = parse_scoreboard(args.board)
+        except ValueError as e:
+            parser.error(str(e))
+        start = time.perf_counter()
+        dist = score_distribution(scoreboard)
+        print_exact_score_statistics(dist)
+        print(f"계산 시간: {time.perf_counter() - start:.1f}초")
+    elif args.command == "serve":
+        run_table_server(parse_address(args.listen), args.workers)
+    elif args.command == "loadtest":
+        run_load_test(parse_address(args.connect), args.tables, cpu_type, args.seed)
+    elif args.command == "league":
+        names = [n.strip() for n in args.agents.split(",") if n.strip()] or None
+        unknown = [n for n in names or [] if n not in agent_names()]
+        if unknown:
+            parser.error(f"알 수 없는 에이전트: {', '.join(unknown)}")
+        try:
+            run_league(names, args.rounds, args.players, args.seed, args.workers,
+                       dict(ANALYSIS_GAME_CONFIG, elite_n_sim=args.elite_n_sim), args.csv)
+        except ValueError as e:
+            parser.error(str(e))
+    elif args.command == "speculate-bench":
+        measure_speculation(args.turns, args.think, args.seed)
+    elif args.command == "report":
+        names = [n.strip() for n in args.agents.split(",") if n.strip()] or None
+        unknown = [n for n in names or [] if n not in agent_names()]
+        if unknown:
+            parser.error(f"알 수 없는 에이전트: {', '.join(unknown)}")
+        version_report(names, args.games, args.seed, args.time_budget, csv_path=args.csv)
+    elif args.command == "verify-rules":
+        start = time.perf_counter()
+        mismatches, compared = verify_rule_tables(args.states, args.seed)
+        print(f"규칙형 결정 표 검증: {compared}개 결정 중 불일치 {mismatches}개 ({time.perf_counter() - start:.1f}초)")
+        return 1 if mismatches else 0
+    elif args.command == "verify-legacy":
+        failures = verify_legacy_parser()
+        print(f"레거시 로그 파서 검증: {len(LEGACY_LOG_CASES)}개 사례 중 실패 {len(failures)}개")
+        for name, result in failures:
+            print(f"  ⚠️ {name}: {result}")
+        return 1 if failures else 0
+    elif args.command == "dataset":
+        build_dataset(args.logs, args.out, args.workers, args.shard_rows)
+    elif args.command == "ingest-legacy":
+        ingest_legacy_logs(args.paths, args.logs, args.workers)
+    elif args.command == "record-games":
+        write_game_records(args.out, (record_simulated_game(cpu_type, game_seed(args.seed, g)) for g in range(args.games)))
+        print(f"💾 게임 기록 {args.games}개 저장 완료: {args.out} ({os.path.getsize(args.out)} bytes)")
+    elif args.command == "replay-verify":
+        checked, failures = verify_game_records(args.path, args.workers)
+        return 1 if failures else 0
+    elif args.command == "selfplay":
+        generate_selfplay_dataset(args.out, args.shards, args.games_per_shard, args.seed, args.first_shard, args.workers)
+    return 0
 
 # --- 메인 실행 ---
 if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        sys.exit(run_cli(sys.argv[1:]))
+    tuned_profiles = None
+    profile_path = os.path.join(get_base_dir(), PROFILE_FILE)
+    if os.path.exists(profile_path):
+        try:
+            tuned_profiles = load_profiles(profile_path)
+            print(f"🧬 튜닝된 프로필을 사용합니다: {', '.join(tuned_profiles)} ({PROFILE_FILE})")
+        except (OSError, ValueError) as e:
+            print(f"⚠️ 프로필을 읽지 못해 기본값을 사용합니다: {e}")
     while True:
         print("\n" + "="*30 + "\n      야찌(Yahtzee) 게임\n" + "="*30)
         print("1. CPU와 대결\n2. 플레이어끼리 대결\n3. CPU끼리 대결\n4. CPU 성능 분석\n5. 이어서 하기\n6. 종료")
@@ -475,6 +3623,8 @@ if __name__ == '__main__':
         players = []
         start_turn = 1
         game_started = False
+        game_config = dict(DEFAULT_GAME_CONFIG, profiles=tuned_profiles)
+        pending = None
 
         if mode == '1':
             name = input("플레이어 이름 입력: ").strip() or "Player 1"
@@ -491,6 +3641,7 @@ if __name__ == '__main__':
                     break
                 else:
                     print("잘못된 입력입니다.")
+            game_config["advisor"] = input("💡 수 추천(어드바이저)을 표시할까요? (y/n): ").strip().lower() == 'y'
 
         elif mode == '2':
             while True:
@@ -506,6 +3657,7 @@ if __name__ == '__main__':
                 name = input(f"플레이어 {i} 이름 입력: ").strip() or f"Player {i}"
                 players.append({'name': name, 'is_cpu': False, 'type': None, 'scoreboard': {c: None for c in CATEGORIES}})
             game_started = True
+            game_config["advisor"] = input("💡 수 추천(어드바이저)을 표시할까요? (y/n): ").strip().lower() == 'y'
 
         elif mode == '3':
             for cpu_type in CPU_TYPES:
@@ -513,6 +3665,15 @@ if __name__ == '__main__':
             game_started = True
 
         elif mode == '4':
+            checkpoint = load_analysis_checkpoint()
+            if checkpoint is not None:
+                print(f"\n중단된 분석이 있습니다: [{checkpoint['cpu_type']}] "
+                      f"{checkpoint['next_game']}/{checkpoint['num_simulations']}회 완료")
+                if input("이어서 분석하시겠습니까? (y/n): ").strip().lower() == 'y':
+                    analyze_cpu_performance(checkpoint['cpu_type'], checkpoint['num_simulations'],
+                                            checkpoint_path=ANALYSIS_CHECKPOINT_FILE, resume=True,
+                                            workers=os.cpu_count() or 1)
+                    continue
             print("\n분석할 CPU 유형 선택:")
             for i, cpu_type in enumerate(CPU_TYPES, 1):
                 print(f"{i}. {cpu_type}")
@@ -525,16 +3686,20 @@ if __name__ == '__main__':
                         if sim_count <= 0: sim_count = 100
                     except ValueError:
                         sim_count = 100
-                    analyze_cpu_performance(selected_cpu, sim_count)
+                    trace_dir = input("턴 트레이스 저장 폴더 (엔터 시 저장 안 함): ").strip() or None
+                    analyze_cpu_performance(selected_cpu, sim_count, trace_dir,
+                                            checkpoint_path=ANALYSIS_CHECKPOINT_FILE, workers=os.cpu_count() or 1,
+                                            config=dict(ANALYSIS_GAME_CONFIG, profiles=tuned_profiles))
                     break
                 else:
                     print("잘못된 입력입니다.")
             continue
 
         elif mode == '5':
-            players, start_turn = load_progress()
+            players, game_config, pending = load_progress()
             if players is None:
                 continue
+            start_turn = min(next_turn_of(p) for p in players)
             print(f"불러온 게임 ▶ 플레이어 수: {len(players)}명, 진행 라운드: {start_turn}부터")
             for p in players:
                 display_scoreboard(p['name'], p['scoreboard'])
@@ -548,20 +3713,58 @@ if __name__ == '__main__':
             print("잘못된 선택입니다."); continue
 
         if game_started:
-            player_logs = {}
+            game_config.setdefault("game_id", new_game_id())
+            # 자리 k의 t턴 주사위는 (seed, k, t) 스트림에서 나오므로, 저장된 seed로 게임을 다시 재현할 수 있고
+            # 이어 하기로 중간 턴부터 시작해도 같은 주사위 흐름을 받는다
+            game_config.setdefault("seed", secrets.randbits(63))
+            records = StateActionLog(LogStore(os.path.join(get_base_dir(), LOG_STORE_DIR)))
+            records.begin_game(game_config["game_id"])
+            journal = GameJournal()
+            journal.compact(players, game_config)
+            planner = None
+            if any(not p['is_cpu'] for p in players):
+                # 사람 차례의 추천/손실 계산이 첫 프롬프트에서 멈추지 않도록 표를 미리 준비한다
+                load_value_table()
+                _turn_tables()
+                if any(p['is_cpu'] and p['type'] == "엘리트형" for p in players):
+                    elite_agent = get_agent("엘리트형", game_config)
+                    planner = elite_agent.speculation = SpeculativePlanner(elite_agent)
             for turn in range(start_turn, 13):
                 print(f"\n--- {turn} 라운드 ---")
-                for p in players:
-                    play_turn(p, turn, player_logs)
-                save_progress(players, turn + 1)
+                for pi, p in enumerate(players):
+                    if next_turn_of(p) > turn:
+                        continue  # 불러온 게임에서 이번 라운드를 이미 마친 플레이어
+                    resume = pending if pending is not None and pending["player"] == pi and pending["turn"] == turn else None
+                    if planner is not None and not p['is_cpu']:
+                        # 사람이 입력하는 동안 엘리트형 CPU들의 다음 턴을 미리 계산 (뒤 자리면 이번 라운드, 앞 자리면 다음 라운드)
+                        planner.start([(q['scoreboard'], turn if qi > pi else turn + 1) for qi, q in enumerate(players)
+                                       if q['is_cpu'] and q['type'] == "엘리트형" and next_turn_of(q) <= 12])
+                    turn_dice = DiceSource([game_config["seed"], pi, turn])
+                    play_turn(p, turn, records, game_config, turn_dice,
+                              journal_event=lambda event, pi=pi: journal.append({**event, "player": pi}),
+                              resume=resume, opponents=[q['scoreboard'] for q in players if q is not p],
+                              ai_dice_source=turn_dice.spawn())
+                    if planner is not None:
+                        planner.stop()
+                pending = None
+                records.flush()
+                flush_policy_caches()
+                journal.compact(players, game_config)
 
             print_final_scores(players)
-            if os.path.exists(SAVE_FILE):
-                os.remove(SAVE_FILE)
+            journal.discard()
+            if planner is not None:
+                planner.stop()
+                elite_agent.speculation = None
+                if planner.hits + planner.misses:
+                    print(f"⚡ 미리 계산해 둔 CPU 결정 적중: {planner.hits}/{planner.hits + planner.misses}")
 
             if any(not p['is_cpu'] for p in players):
-                if input("\n게임 로그를 저장하시겠습니까? (y/n): ").lower() == 'y':
-                    save_all_logs(player_logs)
+                saved = input("\n게임 로그를 저장하시겠습니까? (y/n): ").lower() == 'y'
+                records.end_game(saved, game_config["seed"])
+                if saved:
+                    print(f"📁 로그 저장 완료: {LOG_STORE_DIR}/ (게임 {game_config['game_id']})")
+            records.close()
 
             replay = input("\n다시 플레이하시겠습니까? (y/n): ").strip().lower()
             if replay != 'y':